@@ -1,7 +1,6 @@
 """Configuration settings for NANOREM MLM System"""
 
 import os
-import logging
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -33,6 +32,18 @@ DATABASE_URL: str = os.getenv(
     f"sqlite:///{BASE_DIR / 'nanorem.db'}"
 )
 
+# Connection pool sizing (server databases only; ignored for SQLite).
+# Each process opens up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections for
+# the async engine (bot handlers) plus DB_SYNC_POOL_SIZE +
+# DB_SYNC_MAX_OVERFLOW for the sync one (scheduler, integrations, worker
+# threads): 70 with the defaults, under PostgreSQL's max_connections=100
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_SYNC_POOL_SIZE: int = int(os.getenv("DB_SYNC_POOL_SIZE", "5"))
+DB_SYNC_MAX_OVERFLOW: int = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "5"))
+# Recycle connections older than this many seconds
+DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
 # ====================================
 # APPLICATION SETTINGS
 # ====================================
@@ -53,6 +64,10 @@ LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
 # For deploying bot on a server with webhook instead of polling
 WEBHOOK_URL: str | None = os.getenv("WEBHOOK_URL")
 WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8443"))
+# Interface the local webhook server binds to
+WEBHOOK_LISTEN: str = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+# Sent by Telegram in X-Telegram-Bot-Api-Secret-Token; requests without it are rejected
+WEBHOOK_SECRET: str | None = os.getenv("WEBHOOK_SECRET")
 
 # ====================================
 # MLM CONFIGURATION
@@ -75,7 +90,6 @@ MAX_REFERRAL_DEPTH: int = 5
 # ====================================
 
 if DEBUG:
-    logging.basicConfig(level=logging.DEBUG)
     print(f"\nConfiguration Loaded:")
     print(f"  APP: {APP_NAME} v{APP_VERSION}")
     print(f"  DEBUG: {DEBUG}")
@@ -74,6 +74,11 @@ class CommissionCalculator:
             commission_rates if commission_rates is not None
             else DEFAULT_COMMISSION_RATES
         )
+        # rate% / 100 per level, computed once (exact for Decimal rates)
+        self._rate_fractions: Dict[int, Decimal] = {
+            level: rate / Decimal('100')
+            for level, rate in self.commission_rates.items()
+        }
         self.commissions: List[CommissionRecord] = []
         self._next_commission_id = 1
         self.logger = logger
@@ -193,7 +198,7 @@ class CommissionCalculator:
             return None
 
         rate = self.commission_rates[level]
-        amount = base * rate / Decimal('100')
+        amount = base * self._rate_fractions[level]
 
         record = CommissionRecord(
             commission_id=self._next_commission_id,
@@ -3,12 +3,14 @@
 Handles partner profiles, registration, status tracking, and integration
 with the MLM NetworkManager and CommissionCalculator.
 """
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 import logging
 
+from .network import MAX_LEVELS
+
 logger = logging.getLogger(__name__)
 
 
@@ -111,6 +113,21 @@ class PartnerManager:
         """Find a partner by ID."""
         return self.partners.get(partner_id)
 
+    def get_upline_chain(
+        self, partner_id: int, max_levels: int = MAX_LEVELS
+    ) -> List[Tuple[int, bool]]:
+        """
+        Return the (partner_id, is_active) upline chain of a partner,
+        as consumed by CommissionCalculator.calculate_purchase_commissions().
+        Empty when no NetworkManager is attached.
+
+        Pass a max_levels deeper than MAX_LEVELS so compression can reach
+        active partners above inactive ones.
+        """
+        if not self.network_manager:
+            return []
+        return self.network_manager.get_upline_chain(partner_id, max_levels)
+
     # -----------------------------------------------------------------------
     # Status and activity
     # -----------------------------------------------------------------------
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from database.models import Partner, PartnerStatus
-from database.db import get_session
+from database.db import get_partner_by_telegram_id, get_session
 
 logger = logging.getLogger(__name__)
 
@@ -25,9 +25,7 @@ class SubscriptionManager:
         """
         try:
             with get_session() as session:
-                partner = session.query(Partner).filter(
-                    Partner.telegram_id == str(telegram_id)
-                ).first()
+                partner = get_partner_by_telegram_id(session, telegram_id)
 
                 if not partner:
                     logger.warning(f"[SubscriptionManager] Partner {telegram_id} not found")
@@ -51,9 +49,7 @@ class SubscriptionManager:
         """
         try:
             with get_session() as session:
-                partner = session.query(Partner).filter(
-                    Partner.telegram_id == str(telegram_id)
-                ).first()
+                partner = get_partner_by_telegram_id(session, telegram_id)
 
                 if not partner:
                     return False
@@ -100,9 +96,7 @@ class SubscriptionManager:
         """
         try:
             with get_session() as session:
-                partner = session.query(Partner).filter(
-                    Partner.telegram_id == str(telegram_id)
-                ).first()
+                partner = get_partner_by_telegram_id(session, telegram_id)
 
                 if not partner or partner.status != PartnerStatus.ACTIVE:
                     return None
@@ -122,9 +116,7 @@ class SubscriptionManager:
         """
         try:
             with get_session() as session:
-                partner = session.query(Partner).filter(
-                    Partner.telegram_id == str(telegram_id)
-                ).first()
+                partner = get_partner_by_telegram_id(session, telegram_id)
                 return partner is not None and partner.status == PartnerStatus.ACTIVE
         except Exception as e:
             logger.error(f"[SubscriptionManager] Error checking status for {telegram_id}: {e}")
@@ -1,41 +1,218 @@
 """Database Connection and Session Management for NANOREM MLM System.
 Using SQLAlchemy for ORM and session handling.
 """
+import json
 import logging
-from contextlib import contextmanager
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, scoped_session
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import (
+    String, bindparam, cast, create_engine, exists, func, insert, inspect, literal, or_, select,
+    text, update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, aliased, sessionmaker, scoped_session
 from sqlalchemy.exc import SQLAlchemyError
 
 # Import Base from models to enable table creation
-from .models import Base
-from config import DATABASE_URL
+from .models import Base, Commission, FailedOrder, Partner, PartnerStatus, Product, Purchase
+from config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_SYNC_MAX_OVERFLOW,
+    DB_SYNC_POOL_SIZE,
+)
 
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Engine and Session Setup
 # ---------------------------------------------------------------------------
-_connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+_is_sqlite = DATABASE_URL.startswith("sqlite")
+_connect_args = {"check_same_thread": False} if _is_sqlite else {}
 
-_engine = create_engine(DATABASE_URL, connect_args=_connect_args)
+# Pool settings for the sync and async engines. Each gets its own share
+# of the connection budget (see config.py); SQLite's pools do not take
+# size/overflow arguments, so those apply to server databases only.
+_pool_args = {"pool_pre_ping": True, "pool_recycle": DB_POOL_RECYCLE}
+_sync_pool_args = dict(_pool_args)
+_async_pool_args = dict(_pool_args)
+if not _is_sqlite:
+    _sync_pool_args.update(pool_size=DB_SYNC_POOL_SIZE, max_overflow=DB_SYNC_MAX_OVERFLOW)
+    _async_pool_args.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+_engine = create_engine(DATABASE_URL, connect_args=_connect_args, **_sync_pool_args)
 _session_factory = sessionmaker(bind=_engine)
 
 # Thread-local scoped session (safe for multi-threaded bot)
 SessionLocal = scoped_session(_session_factory)
 
+# Async driver used for each backend when the bot talks to the DB from
+# the event loop (DATABASE_URL keeps the sync driver for everything else)
+_ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def _async_url(url: str) -> str:
+    """Translate a sync DATABASE_URL into its asyncio-driver equivalent."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+_async_engine = create_async_engine(_async_url(DATABASE_URL), **_async_pool_args)
+# expire_on_commit=False: handlers read attributes after the commit and
+# must not trigger (unsupported) implicit async lazy loads
+_async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+
+# Set once init_db() has verified or created the schema in this process
+_db_initialized = False
+
+# Prebuilt statement for the hottest lookup (every bot command).
+# SQLAlchemy caches its compiled SQL, so calls only bind the parameter.
+_PARTNER_BY_TELEGRAM_ID = select(Partner).where(
+    Partner.telegram_id == bindparam('telegram_id')
+)
+
+# Increments of the running totals on Partner (what /profile shows).
+# Core UPDATEs, so a list of parameter sets runs as one executemany;
+# done in SQL to keep the Numeric columns exact.
+_partners = Partner.__table__
+ADD_COMMISSION_TOTAL = (
+    update(_partners)
+    .where(_partners.c.id == bindparam('partner_id_'))
+    .values(total_commissions=func.coalesce(_partners.c.total_commissions, 0) + bindparam('amount'))
+)
+ADD_PROCUREMENT_TOTAL = (
+    update(_partners)
+    .where(_partners.c.id == bindparam('partner_id_'))
+    .values(total_procurement=func.coalesce(_partners.c.total_procurement, 0) + bindparam('amount'))
+)
+
+# One-off repair for partners registered while /register stored the
+# referrer's Telegram id in upline_id instead of its partners.id. Only
+# rows whose upline_id is not an existing partner id but does match a
+# partner's telegram_id are rewritten, so running it again is a no-op.
+_referrer = _partners.alias('referrer')
+_existing = _partners.alias('existing')
+_referrer_match = _referrer.c.telegram_id == cast(_partners.c.upline_id, String)
+BACKFILL_UPLINE_IDS = (
+    update(_partners)
+    .where(_partners.c.upline_id.is_not(None))
+    .where(_partners.c.upline_id.not_in(select(_existing.c.id)))
+    .where(exists().where(_referrer_match))
+    .values(upline_id=select(_referrer.c.id).where(_referrer_match).scalar_subquery())
+)
+
+# One-off backfill of the running totals for partners that predate them
+# (the columns default to 0). The totals are recomputed from the rows
+# /profile used to sum, and only partners whose totals disagree are
+# rewritten, so running it again is a no-op.
+_commission_sum = (
+    select(func.coalesce(func.sum(Commission.amount), 0))
+    .where(Commission.partner_id == _partners.c.id)
+    .scalar_subquery()
+)
+_procurement_sum = (
+    select(func.coalesce(func.sum(Purchase.amount), 0))
+    .where(Purchase.partner_id == _partners.c.id)
+    .scalar_subquery()
+)
+BACKFILL_PARTNER_TOTALS = (
+    update(_partners)
+    .where(or_(
+        func.coalesce(_partners.c.total_commissions, 0) != _commission_sum,
+        func.coalesce(_partners.c.total_procurement, 0) != _procurement_sum,
+    ))
+    .values(total_commissions=_commission_sum, total_procurement=_procurement_sum)
+)
+
+# How far up the tree to look when building a commission chain; deeper
+# than MAX_LEVELS so inactive partners can be compressed past
+UPLINE_SCAN_DEPTH = 10
+
+# Upline chain of a partner (direct sponsor first) in one recursive query
+_upline = (
+    select(Partner.upline_id.label('id'), literal(1).label('depth'))
+    .where(Partner.id == bindparam('partner_id'))
+    .cte('upline_chain', recursive=True)
+)
+_sponsor = aliased(Partner)
+_upline = _upline.union_all(
+    select(_sponsor.upline_id, _upline.c.depth + 1)
+    .where(_sponsor.id == _upline.c.id)
+    .where(_upline.c.depth < UPLINE_SCAN_DEPTH)
+)
+_UPLINE_CHAIN = (
+    select(Partner.id, Partner.status)
+    .join(_upline, Partner.id == _upline.c.id)
+    .order_by(_upline.c.depth)
+)
+
+# Catalog upsert keyed by the nanorvs.ru product id. A list of row
+# dicts runs as one executemany INSERT ... ON CONFLICT DO UPDATE.
+_products = Product.__table__
+_product_insert = (sqlite_insert if _is_sqlite else pg_insert)(_products)
+UPSERT_PRODUCTS = _product_insert.on_conflict_do_update(
+    index_elements=[_products.c.ext_id],
+    set_={
+        name: _product_insert.excluded[name]
+        for name in ('name', 'price', 'description', 'category', 'updated_at')
+    },
+)
+
 
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
-def init_db() -> None:
+def _schema_exists() -> bool:
+    """Return True if every table from models.py is already present."""
+    existing = set(inspect(_engine).get_table_names())
+    return set(Base.metadata.tables).issubset(existing)
+
+
+def _backfill() -> None:
+    """Repair rows written by older versions; safe to run repeatedly.
+
+    Scans every partner, so it only runs from init_db(force=True)
+    (main.py --init-db), never on a normal start.
+    """
+    with _engine.begin() as conn:
+        fixed = conn.execute(BACKFILL_UPLINE_IDS).rowcount
+        totals = conn.execute(BACKFILL_PARTNER_TOTALS).rowcount
+    if fixed:
+        logger.info(f"init_db: converted {fixed} upline_id values from Telegram ids")
+    if totals:
+        # After the first run this means the running totals drifted
+        logger.warning(f"init_db: recomputed running totals of {totals} partners")
+
+
+def init_db(force: bool = False) -> None:
     """Create all tables defined in models.py.
-    Call once at application startup.
+    Call once at application startup. Does nothing when it already ran
+    in this process or the schema is already in place, unless force=True.
+    force=True (main.py --init-db) also runs the data backfills for rows
+    written by older versions.
     """
+    global _db_initialized
+    if _db_initialized and not force:
+        return
     try:
-        Base.metadata.create_all(_engine)
-        logger.info("init_db: all tables created successfully.")
+        if not force and _schema_exists():
+            logger.debug("init_db: schema already exists, skipping.")
+        else:
+            Base.metadata.create_all(_engine)
+            logger.info("init_db: all tables created successfully.")
+        if force:
+            _backfill()
+        _db_initialized = True
     except SQLAlchemyError as e:
         logger.error(f"init_db: failed to create tables: {e}")
         raise
@@ -43,8 +220,13 @@ def init_db() -> None:
 
 @contextmanager
 def get_session():
-    """Context manager for obtaining a DB session with auto-commit/rollback."""
-    session = SessionLocal()
+    """Context manager for obtaining a DB session with auto-commit/rollback.
+
+    Each call gets its own Session rather than the thread-local
+    SessionLocal, since concurrently running bot handlers share the
+    event loop thread.
+    """
+    session = _session_factory()
     try:
         yield session
         session.commit()
@@ -55,6 +237,56 @@ def get_session():
         session.close()
 
 
+def get_partner_by_telegram_id(session: Session, telegram_id) -> Optional[Partner]:
+    """Return the partner with the given Telegram user id, or None."""
+    return session.execute(
+        _PARTNER_BY_TELEGRAM_ID, {'telegram_id': str(telegram_id)}
+    ).scalar_one_or_none()
+
+
+def get_upline_chain(session: Session, partner_id: int) -> List[Tuple[int, bool]]:
+    """Return [(partner_id, is_active), ...] from the direct sponsor upwards.
+
+    This is the format CommissionCalculator.calculate_purchase_commissions()
+    expects.
+    """
+    rows = session.execute(_UPLINE_CHAIN, {'partner_id': partner_id})
+    return [(pid, status == PartnerStatus.ACTIVE) for pid, status in rows]
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Async counterpart of get_session() for use inside bot handlers.
+
+    DB I/O is awaited, so other updates keep being processed meanwhile.
+    """
+    async with _async_session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def get_partner_by_telegram_id_async(
+    session: AsyncSession, telegram_id
+) -> Optional[Partner]:
+    """Async variant of get_partner_by_telegram_id()."""
+    result = await session.execute(
+        _PARTNER_BY_TELEGRAM_ID, {'telegram_id': str(telegram_id)}
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_upline_chain_async(
+    session: AsyncSession, partner_id: int
+) -> List[Tuple[int, bool]]:
+    """Async variant of get_upline_chain()."""
+    rows = await session.execute(_UPLINE_CHAIN, {'partner_id': partner_id})
+    return [(pid, status == PartnerStatus.ACTIVE) for pid, status in rows]
+
+
 def check_connection() -> bool:
     """Return True if the database is reachable."""
     try:
@@ -77,8 +309,8 @@ class DatabaseManager:
         self.engine = _engine
         self.Session = SessionLocal
 
-    def init_db(self):
-        return init_db()
+    def init_db(self, force: bool = False):
+        return init_db(force=force)
 
     def get_session(self):
         return SessionLocal()
@@ -89,6 +321,49 @@ class DatabaseManager:
     def check_connection(self) -> bool:
         return check_connection()
 
+    def count_products(self) -> int:
+        """Return the number of catalog products stored locally."""
+        with get_session() as session:
+            return session.execute(select(func.count()).select_from(Product)).scalar_one()
+
+    def upsert_products(self, rows: List[dict]) -> int:
+        """Insert or update catalog products in a single statement.
+
+        Args:
+            rows: Dicts with ext_id, name, price, description, category
+
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+        with get_session() as session:
+            session.execute(UPSERT_PRODUCTS, rows)
+        return len(rows)
+
+    def save_failed_orders(self, orders: List[dict], attempts: int) -> int:
+        """Store webhook orders that could not be processed as dead letters.
+
+        Args:
+            orders: Order payloads as received from nanorvs.ru
+            attempts: How many times each order was tried
+
+        Returns:
+            Number of rows written
+        """
+        if not orders:
+            return 0
+        with get_session() as session:
+            session.execute(insert(FailedOrder), [
+                {
+                    'order_id': str(order.get('id')),
+                    'payload': json.dumps(order, ensure_ascii=False, default=str),
+                    'attempts': attempts,
+                }
+                for order in orders
+            ])
+        return len(orders)
+
 
 # Singleton instance (legacy usage)
 db = DatabaseManager()
@@ -1,16 +1,21 @@
 """Database Models for NANOREM MLM System using SQLAlchemy
 
 This module defines the schema for partners, purchases (orders),
-and commissions, synchronized with the core MLM logic.
+commissions, the nanorvs.ru product catalog and webhook orders that
+could not be processed, synchronized with the core MLM logic.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, Text, Boolean
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum as SQLEnum, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
 
 Base = declarative_base()
 
+# Fixed-point type for all money columns (rubles with kopecks).
+# Values round-trip as Decimal, matching core.commission arithmetic.
+Money = Numeric(14, 2)
+
 
 class PartnerStatus(enum.Enum):
     """Partner status enumeration (matches core.partner_manager)."""
@@ -38,6 +43,11 @@ class CommissionStatus(enum.Enum):
 class Partner(Base):
     """Partner/Participant of the NANOREM MLM network."""
     __tablename__ = 'partners'
+    __table_args__ = (
+        # Covers downline walks (WHERE upline_id = ? -> id) without
+        # touching the table rows; also serves plain upline_id lookups
+        Index('ix_partners_upline_id_id', 'upline_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(String(50), unique=True, index=True)
@@ -48,7 +58,7 @@ class Partner(Base):
     phone = Column(String(50))
 
     # Hierarchy
-    upline_id = Column(Integer, ForeignKey('partners.id'), nullable=True, index=True)
+    upline_id = Column(Integer, ForeignKey('partners.id'), nullable=True)
     status = Column(SQLEnum(PartnerStatus), default=PartnerStatus.INACTIVE, index=True)
 
     # Timestamps
@@ -57,8 +67,8 @@ class Partner(Base):
     subscription_end_date = Column(DateTime)
 
     # Accumulated totals
-    total_procurement = Column(Float, default=0.0)
-    total_commissions = Column(Float, default=0.0)
+    total_procurement = Column(Money, default=0)
+    total_commissions = Column(Money, default=0)
 
     # Relationships
     upline = relationship('Partner', remote_side=[id], backref='downline')
@@ -77,7 +87,7 @@ class Purchase(Base):
     purchase_number = Column(String(50), unique=True, nullable=False)
     partner_id = Column(Integer, ForeignKey('partners.id'), nullable=False, index=True)
 
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     currency = Column(String(10), default='RUB')
     status = Column(String(20), default='pending')
 
@@ -103,9 +113,9 @@ class Commission(Base):
     source_partner_id = Column(Integer, ForeignKey('partners.id'))
 
     level = Column(Integer, nullable=False)
-    rate = Column(Float, nullable=False)
-    base_amount = Column(Float, nullable=False)
-    amount = Column(Float, nullable=False)
+    rate = Column(Numeric(5, 2), nullable=False)
+    base_amount = Column(Money, nullable=False)
+    amount = Column(Money, nullable=False)
 
     status = Column(SQLEnum(CommissionStatus), default=CommissionStatus.PENDING, index=True)
     is_compressed = Column(Boolean, default=False)
@@ -122,3 +132,38 @@ class Commission(Base):
 
     def __repr__(self):
         return f"<Commission id={self.id} level={self.level} amount={self.amount}>"
+
+
+class Product(Base):
+    """Catalog product mirrored from nanorvs.ru (see web.catalog_sync)."""
+    __tablename__ = 'products'
+
+    id = Column(Integer, primary_key=True)
+    ext_id = Column(String(100), unique=True, nullable=False)
+    name = Column(String(255), nullable=False)
+    price = Column(Money)
+    description = Column(Text)
+    category = Column(String(100), index=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Product id={self.id} ext_id={self.ext_id} name={self.name}>"
+
+
+class FailedOrder(Base):
+    """nanorvs.ru webhook order given up on after retries (dead letter).
+
+    The payload is kept verbatim so the order can be inspected and replayed.
+    """
+    __tablename__ = 'failed_orders'
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(String(100), index=True)
+    payload = Column(Text, nullable=False)  # order JSON as received
+    attempts = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FailedOrder id={self.id} order_id={self.order_id}>"
@@ -1,9 +1,9 @@
 """Integrations Module - External Services Integration"""
 
-from .cash_register import CashRegisterAPI
+from .cash_register import CashRegisterIntegration
 from .cash_register_config import CashRegisterConfig
 
 __all__ = [
-    'CashRegisterAPI',
+    'CashRegisterIntegration',
     'CashRegisterConfig',
 ]
@@ -1,17 +1,32 @@
 """Cloud Cash Register Integration Module.
 Handles receipt processing and synchronization with the MLM system.
 """
+import asyncio
 import logging
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, Any, List
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Set, Tuple
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import (
+    ADD_COMMISSION_TOTAL,
+    ADD_PROCUREMENT_TOTAL,
+    get_partner_by_telegram_id,
+    get_session,
+    get_upline_chain,
+)
 from database.models import Purchase, Partner, Commission, OrderStatus, CommissionStatus
 from core.commission import CommissionCalculator
-from telegram.notifications import notify_commission
+from tgbot.notifications import notify_commissions
 
 logger = logging.getLogger(__name__)
 
+# Strong references to in-flight notification tasks (the event loop
+# only keeps weak ones)
+_background_tasks: Set[asyncio.Task] = set()
+
+
 class CashRegisterIntegration:
     """Orchestrator for Cash Register events and MLM payouts."""
 
@@ -24,39 +39,71 @@ class CashRegisterIntegration:
         Register a purchase and trigger MLM commissions.
         Expects keys: partner_id (or telegram_id), amount, order_id
         """
-        # Allow either passed session or new session
-        session = self.session if self.session else SessionLocal()
-        
         try:
+            # Blocking DB work runs in a worker thread, off the event loop
+            result = await asyncio.to_thread(self._record_purchase, data)
+        except Exception as e:
+            logger.error(f"Failed to process purchase: {e}")
+            return False
+
+        if result is None:
+            return False
+        buyer_name, amount, notifications, commission_count = result
+
+        # Fire-and-forget notifications once the purchase is stored
+        if notifications:
+            task = asyncio.create_task(notify_commissions(notifications, buyer_name))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+        logger.info(f"Processed purchase for {buyer_name}: {amount} rub. Commissions: {commission_count}")
+        return True
+
+    def _record_purchase(
+        self, data: Dict[str, Any]
+    ) -> Optional[Tuple[str, Decimal, List[Tuple[str, Decimal, int]], int]]:
+        """Store the purchase and its commissions (blocking).
+
+        Returns:
+            (buyer_name, amount, notifications, commission_count), or None
+            if the partner was not found
+        """
+        notifications = []
+
+        # Use the caller's session if given (caller commits), else our own
+        with self._session_scope() as session:
             partner_id = data.get('partner_id')
             telegram_id = data.get('telegram_id')
-            amount = float(data.get('amount', 0))
+            amount = Decimal(str(data.get('amount', 0)))
             order_id = data.get('order_id')
 
             # 1. Resolve partner
             if partner_id:
-                partner = session.query(Partner).get(partner_id)
+                partner = session.get(Partner, partner_id)
             else:
-                partner = session.query(Partner).filter(Partner.telegram_id == telegram_id).first()
+                partner = get_partner_by_telegram_id(session, telegram_id)
 
             if not partner:
                 logger.error(f"Partner not found for purchase data: {data}")
-                return False
+                return None
 
             # 2. Save Purchase
             purchase = Purchase(
                 purchase_number=order_id or f"PUR-{int(datetime.utcnow().timestamp())}",
                 partner_id=partner.id,
                 amount=amount,
-                status=OrderStatus.PAID,
+                status=OrderStatus.PAID.value,
                 paid_at=datetime.utcnow(),
                 ext_ref=order_id
             )
             session.add(purchase)
             session.flush()
+            session.execute(
+                ADD_PROCUREMENT_TOTAL, {'partner_id_': partner.id, 'amount': amount}
+            )
 
             # 3. Build upline chain
-            upline_chain = self._get_upline_chain(session, partner.id)
+            upline_chain = get_upline_chain(session, partner.id)
 
             # 4. Calculate Commissions (core logic)
             calculated = self.calculator.calculate_purchase_commissions(
@@ -65,69 +112,46 @@ class CashRegisterIntegration:
                 upline_chain=upline_chain
             )
 
-            # 5. Save and Notify
-            notifications = []
+            # 5. Save and collect notifications
             buyer_name = partner.username or f"ID:{partner.telegram_id}"
-            
-            for c in calculated:
-                db_comm = Commission(
-                    partner_id=c.partner_id,
-                    purchase_id=purchase.id,
-                    source_partner_id=partner.id,
-                    level=c.level,
-                    rate=c.rate,
-                    base_amount=c.base_amount,
-                    amount=c.amount,
-                    status=CommissionStatus.PENDING,
-                    is_compressed=c.compressed,
-                    notes=c.notes
-                )
-                session.add(db_comm)
-                
-                # Fetch telegram_id for notification
-                beneficiary = session.query(Partner).get(c.partner_id)
-                if beneficiary and beneficiary.telegram_id:
-                    notifications.append(
-                        notify_commission(
-                            beneficiary.telegram_id, 
-                            c.amount, 
-                            c.level, 
-                            buyer_name
-                        )
-                    )
-
-            if not self.session: # Commit only if we created the session
-                session.commit()
-                
-            # Trigger notifications asynchronously
-            import asyncio
-            if notifications:
-                asyncio.create_task(asyncio.gather(*notifications))
-
-            logger.info(f"Processed purchase for {buyer_name}: {amount} rub. Commissions: {len(calculated)}")
-            return True
 
-        except Exception as e:
-            if not self.session: session.rollback()
-            logger.error(f"Failed to process purchase: {e}")
-            return False
-        finally:
-            if not self.session: session.close()
-
-    def _get_upline_chain(self, session: Session, start_id: int) -> List[tuple]:
-        """Build (partner_id, is_active) chain for calculator."""
-        chain = []
-        curr = session.query(Partner).get(start_id)
-        
-        # Max 5 levels of payouts usually, but let's walk enough for compression
-        for _ in range(10):
-            if not curr or not curr.upline_id: break
-            
-            # Find upline partner by telegram_id (upline_id is telegram_id in current models)
-            upline = session.query(Partner).filter(Partner.telegram_id == curr.upline_id).first()
-            if not upline: break
-            
-            chain.append((upline.id, upline.is_active))
-            curr = upline
-            
-        return chain
+            if calculated:
+                # All levels in one executemany INSERT
+                session.execute(insert(Commission), [
+                    {
+                        'partner_id': c.partner_id,
+                        'purchase_id': purchase.id,
+                        'source_partner_id': partner.id,
+                        'level': c.level,
+                        'rate': c.rate,
+                        'base_amount': c.base_amount,
+                        'amount': c.amount,
+                        'status': CommissionStatus.PENDING,
+                        'is_compressed': c.compressed,
+                        'notes': c.notes,
+                    }
+                    for c in calculated
+                ])
+                session.execute(ADD_COMMISSION_TOTAL, [
+                    {'partner_id_': c.partner_id, 'amount': c.amount}
+                    for c in calculated
+                ])
+
+                # Telegram ids of all beneficiaries in one query
+                telegram_ids = dict(session.execute(
+                    select(Partner.id, Partner.telegram_id)
+                    .where(Partner.id.in_({c.partner_id for c in calculated}))
+                ).all())
+                notifications = [
+                    (telegram_ids[c.partner_id], c.amount, c.level)
+                    for c in calculated
+                    if telegram_ids.get(c.partner_id)
+                ]
+
+        return buyer_name, amount, notifications, len(calculated)
+
+    def _session_scope(self):
+        """Context manager yielding the injected session or a fresh managed one."""
+        if self.session:
+            return nullcontext(self.session)
+        return get_session()
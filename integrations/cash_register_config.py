@@ -5,96 +5,165 @@ To be filled in with actual provider details when available.
 """
 
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Optional
 from dotenv import load_dotenv
 
-load_dotenv()
+# Snapshot of the environment, filled on first use; see reload_env()
+_ENV: Dict[str, str] = {}
 
 
-@dataclass
+@lru_cache(maxsize=1)
+def _ensure_env_loaded() -> Dict[str, str]:
+    """Parse .env and snapshot os.environ once per process."""
+    load_dotenv()
+    _ENV.update(os.environ)
+    return _ENV
+
+
+def _as_bool(value: str) -> bool:
+    return value.lower() == 'true'
+
+
+def _get(key: str, default: Any = None, cast: Callable[[str], Any] = str) -> Any:
+    """Read a value from the cached environment snapshot."""
+    value = _ensure_env_loaded().get(key)
+    if value is None:
+        return default
+    return cast(value)
+
+
+def _env(key: str, default: Any = None, cast: Callable[[str], Any] = str):
+    """Dataclass field whose default is resolved from the env snapshot."""
+    return field(default_factory=lambda: _get(key, default, cast))
+
+
+def reload_env() -> None:
+    """
+    Refresh the cached environment snapshot.
+
+    Useful in tests that modify os.environ after this module was imported.
+    """
+    _ENV.clear()
+    _ensure_env_loaded.cache_clear()
+    get_default_config.cache_clear()
+
+
+@dataclass(frozen=True, slots=True)
 class CashRegisterConfig:
     """
     Configuration for Cloud Cash Register API
+
+    Instances are immutable and hashable; use dataclasses.replace()
+    to derive a modified copy.
     
     TODO: Update with actual values from manufacturer
     """
     
     # API Endpoint Configuration
-    api_provider: str = os.getenv('CASH_REGISTER_PROVIDER', 'unknown')
-    api_endpoint: str = os.getenv(
+    api_provider: str = _env('CASH_REGISTER_PROVIDER', 'unknown')
+    api_endpoint: str = _env(
         'CASH_REGISTER_API_ENDPOINT',
         'https://api.cashregister.example.com/v1'
     )
-    api_version: str = os.getenv('CASH_REGISTER_API_VERSION', '1.0')
+    api_version: str = _env('CASH_REGISTER_API_VERSION', '1.0')
     
     # Authentication
-    auth_token: str = os.getenv('CASH_REGISTER_AUTH_TOKEN', '')
-    auth_secret: Optional[str] = os.getenv('CASH_REGISTER_AUTH_SECRET', None)
-    api_key: str = os.getenv('CASH_REGISTER_API_KEY', '')
+    auth_token: str = _env('CASH_REGISTER_AUTH_TOKEN', '')
+    auth_secret: Optional[str] = _env('CASH_REGISTER_AUTH_SECRET')
+    api_key: str = _env('CASH_REGISTER_API_KEY', '')
     
     # Connection Settings
-    timeout: int = int(os.getenv('CASH_REGISTER_TIMEOUT', '30'))
-    max_retries: int = int(os.getenv('CASH_REGISTER_MAX_RETRIES', '3'))
-    retry_delay: int = int(os.getenv('CASH_REGISTER_RETRY_DELAY', '5'))
+    timeout: int = _env('CASH_REGISTER_TIMEOUT', 30, int)
+    max_retries: int = _env('CASH_REGISTER_MAX_RETRIES', 3, int)
+    retry_delay: int = _env('CASH_REGISTER_RETRY_DELAY', 5, int)
     
     # Webhook Configuration
-    webhook_secret: str = os.getenv('CASH_REGISTER_WEBHOOK_SECRET', '')
-    webhook_url: str = os.getenv(
+    webhook_secret: str = _env('CASH_REGISTER_WEBHOOK_SECRET', '')
+    webhook_url: str = _env(
         'CASH_REGISTER_WEBHOOK_URL',
         'https://nanorem.example.com/webhooks/cash-register'
     )
     
     # Store/Register Information
-    store_id: Optional[str] = os.getenv('CASH_REGISTER_STORE_ID', None)
-    register_id: Optional[str] = os.getenv('CASH_REGISTER_REGISTER_ID', None)
+    store_id: Optional[str] = _env('CASH_REGISTER_STORE_ID')
+    register_id: Optional[str] = _env('CASH_REGISTER_REGISTER_ID')
     
     # Feature Flags
-    enable_receipts: bool = os.getenv('CASH_REGISTER_ENABLE_RECEIPTS', 'true').lower() == 'true'
-    enable_sync: bool = os.getenv('CASH_REGISTER_ENABLE_SYNC', 'true').lower() == 'true'
-    enable_webhooks: bool = os.getenv('CASH_REGISTER_ENABLE_WEBHOOKS', 'true').lower() == 'true'
+    enable_receipts: bool = _env('CASH_REGISTER_ENABLE_RECEIPTS', True, _as_bool)
+    enable_sync: bool = _env('CASH_REGISTER_ENABLE_SYNC', True, _as_bool)
+    enable_webhooks: bool = _env('CASH_REGISTER_ENABLE_WEBHOOKS', True, _as_bool)
     
     # Sync Settings
-    auto_sync_interval: int = int(os.getenv('CASH_REGISTER_AUTO_SYNC_INTERVAL', '3600'))
-    sync_batch_size: int = int(os.getenv('CASH_REGISTER_SYNC_BATCH_SIZE', '100'))
+    auto_sync_interval: int = _env('CASH_REGISTER_AUTO_SYNC_INTERVAL', 3600, int)
+    sync_batch_size: int = _env('CASH_REGISTER_SYNC_BATCH_SIZE', 100, int)
     
     # Report Settings
-    daily_report_enabled: bool = os.getenv('CASH_REGISTER_DAILY_REPORT', 'true').lower() == 'true'
-    daily_report_time: str = os.getenv('CASH_REGISTER_DAILY_REPORT_TIME', '23:00')
+    daily_report_enabled: bool = _env('CASH_REGISTER_DAILY_REPORT', True, _as_bool)
+    daily_report_time: str = _env('CASH_REGISTER_DAILY_REPORT_TIME', '23:00')
+
+    # Lazily computed by is_configured() / get_headers()
+    # (slots rule out cached_property)
+    _configured: Optional[bool] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _headers: Optional[Dict[str, str]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
     
     def is_configured(self) -> bool:
         """
         Check if cash register is properly configured.
         
+        The result is computed once per (immutable) instance.
+
         Returns:
             bool: True if minimum required configuration is present
         """
-        return bool(
-            self.api_endpoint != 'https://api.cashregister.example.com/v1' and
-            self.api_key and
-            self.auth_token
-        )
+        if self._configured is None:
+            object.__setattr__(self, '_configured', bool(
+                self.api_endpoint != 'https://api.cashregister.example.com/v1' and
+                self.api_key and
+                self.auth_token
+            ))
+        return self._configured
     
     def get_headers(self) -> dict:
         """
         Get HTTP headers for API requests.
         
+        The dict is built once per instance and shared between calls;
+        copy it before modifying.
+
         Returns:
             Dictionary with authorization and other headers
         """
-        return {
-            'Authorization': f'Bearer {self.auth_token}',
-            'X-API-Key': self.api_key,
-            'Content-Type': 'application/json',
-            'User-Agent': 'NANOREM-MLM/1.0',
-        }
+        if self._headers is None:
+            object.__setattr__(self, '_headers', {
+                'Authorization': f'Bearer {self.auth_token}',
+                'X-API-Key': self.api_key,
+                'Content-Type': 'application/json',
+                'User-Agent': 'NANOREM-MLM/1.0',
+            })
+        return self._headers
 
 
-# Default configuration instance
-default_config = CashRegisterConfig()
+@lru_cache(maxsize=1)
+def get_default_config() -> CashRegisterConfig:
+    """Return the shared default configuration, created on first use."""
+    return CashRegisterConfig()
 
 
-class CashRegisterProviders:
+def __getattr__(name: str) -> Any:
+    # Keep `default_config` importable without building it at import time
+    if name == 'default_config':
+        return get_default_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class CashRegisterProviders(str, Enum):
     """
     Known cloud cash register providers
     
@@ -110,39 +179,54 @@ class CashRegisterProviders:
     CLOUDKASSA = 'cloudkassa'  # CloudKassa
     CUSTOM = 'custom'      # Custom/Generic provider
     
-    SUPPORTED = [
-        IIKO, ATOL, TAXCOM, YANDEX_KASSA, PAYKEEPER, CLOUDKASSA, CUSTOM
-    ]
+    # str()/f-strings give the plain value ('iiko'), as the former plain
+    # string attributes did, not 'CashRegisterProviders.IIKO'
+    __str__ = str.__str__
+
 
+# Members compare and hash like their string values, so plain strings
+# such as CashRegisterConfig.api_provider can be checked directly
+SUPPORTED_PROVIDERS: FrozenSet[CashRegisterProviders] = frozenset(CashRegisterProviders)
 
+
+@dataclass(frozen=True)
 class ReceiptSettings:
     """
     Receipt generation and formatting settings
+
+    Read them from default_receipt_settings (or a dataclasses.replace()
+    copy of it). The field names and defaults are those of the former
+    plain class, and, without __slots__, the defaults stay readable on
+    the class itself, so ReceiptSettings.INCLUDE_QR_CODE still works.
     
     TODO: Configure based on requirements
     """
     
     # Receipt format
-    INCLUDE_QR_CODE = True
-    INCLUDE_PARTNER_INFO = True
-    INCLUDE_PRODUCT_DETAILS = True
-    INCLUDE_COMMISSION_INFO = False  # For partner receipts
+    INCLUDE_QR_CODE: bool = True
+    INCLUDE_PARTNER_INFO: bool = True
+    INCLUDE_PRODUCT_DETAILS: bool = True
+    INCLUDE_COMMISSION_INFO: bool = False  # For partner receipts
     
     # Email settings
-    SEND_EMAIL_RECEIPT = True
-    EMAIL_FORMAT = 'html'  # 'html' or 'pdf'
+    SEND_EMAIL_RECEIPT: bool = True
+    EMAIL_FORMAT: str = 'html'  # 'html' or 'pdf'
     
     # Print settings
-    AUTO_PRINT = False
-    PRINT_COPIES = 2
+    AUTO_PRINT: bool = False
+    PRINT_COPIES: int = 2
     
     # Storage
-    STORE_RECEIPT_PDF = True
-    STORE_RECEIPT_JSON = True
-    RETENTION_DAYS = 365
+    STORE_RECEIPT_PDF: bool = True
+    STORE_RECEIPT_JSON: bool = True
+    RETENTION_DAYS: int = 365
+
+
+# Default receipt settings instance; use this rather than the class
+default_receipt_settings = ReceiptSettings()
 
 
-print("""
+_STATUS_BANNER = """
 ╔════════════════════════════════════════════════════════════╗
 ║  Cloud Cash Register Integration - Configuration Status     ║
 ╠════════════════════════════════════════════════════════════╣
@@ -155,4 +239,9 @@ print("""
 ║  3. Test API connectivity                                    ║
 ║  4. Configure receipt sync schedule                          ║
 ╚════════════════════════════════════════════════════════════╝
-""")
+"""
+
+
+def print_status() -> None:
+    """Print the integration status banner (called from main.py in DEBUG mode)."""
+    print(_STATUS_BANNER)
@@ -1,36 +1,102 @@
 #!/usr/bin/env python3
-"""NANOREM MLM System - Main Application Entry Point."""
+"""NANOREM MLM System - Main Application Entry Point.
 
+Heavy dependencies (python-telegram-bot, SQLAlchemy) are imported inside
+the branches that need them, so cheap commands such as ``--version``
+start instantly.
+"""
+
+import argparse
+import atexit
+import queue
 import sys
 import logging
-from pathlib import Path
-
-# Add project root to sys.path
-sys.path.insert(0, str(Path(__file__).parent))
+from logging.handlers import QueueHandler, QueueListener
 
-from config import BOT_TOKEN, DEBUG
-from tgbot.bot import TelegramBot
 
+def configure_logging(debug: bool = False) -> QueueListener:
+    """Set up logging configuration.
 
-def configure_logging(debug: bool = False) -> None:
-    """Set up logging configuration."""
+    Records are handed to a queue and formatted/written by a background
+    listener thread, so timestamp formatting and stream I/O do not run
+    on the bot's event loop.
+    """
     level = logging.DEBUG if debug else logging.INFO
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+
+    # Record attributes the log format never uses
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(
+        "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="NANOREM MLM System")
+    parser.add_argument(
+        "--mode", choices=["telegram"], default="telegram",
+        help="run mode (default: telegram)",
+    )
+    parser.add_argument(
+        "--version", action="store_true",
+        help="print application version and exit",
     )
+    parser.add_argument(
+        "--init-db", action="store_true",
+        help="create database tables, migrate existing data and exit",
+    )
+    parser.add_argument(
+        "--debug", action="store_true",
+        help="enable debug logging (overrides DEBUG from .env)",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     """Main entry point for NANOREM MLM Bot."""
-    configure_logging(debug=DEBUG)
+    args = parse_args(argv)
+
+    # Imported after argument parsing so `--help` does not load .env
+    import config
+
+    if args.version:
+        print(f"{config.APP_NAME} v{config.APP_VERSION}")
+        return
+
+    debug = args.debug or config.DEBUG
+    configure_logging(debug=debug)
     logger = logging.getLogger(__name__)
 
-    if not BOT_TOKEN:
+    if args.init_db:
+        from database.db import init_db
+        init_db(force=True)
+        return
+
+    if debug:
+        from integrations.cash_register_config import print_status
+        print_status()
+
+    if not config.BOT_TOKEN:
         logger.error("BOT_TOKEN is not configured. Set it in .env or config.py")
         sys.exit(1)
 
+    from tgbot.bot import TelegramBot
+
     logger.info("Initializing NANOREM MLM Telegram Bot...")
     bot = TelegramBot()
     bot.run()
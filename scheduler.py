@@ -5,19 +5,83 @@ This module implements periodic tasks such as:
 - Daily commission summary notifications
 - Database cleanup
 
-Uses APScheduler for async task scheduling.
+Jobs run as plain asyncio tasks on the bot's event loop; with only a
+couple of fixed schedules a full APScheduler setup is not needed.
 """
+import asyncio
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
+from typing import Awaitable, Callable, Dict, Tuple
+
+from sqlalchemy import text
 
 from core.subscription_manager import subscription_manager
+from database.db import get_session
+from database.models import PartnerStatus
 
 logger = logging.getLogger(__name__)
 
-# Scheduler instance (singleton)
-_scheduler: AsyncIOScheduler = None
+Job = Callable[[], Awaitable[None]]
+
+# Raw SQL for the daily summary: plain rows, no ORM machinery involved
+_STATUS_COUNTS_SQL = text("SELECT status, COUNT(*) FROM partners GROUP BY status")
+
+# Status values as stored in the column (SQLAlchemy's Enum stores member names)
+_ACTIVE_DB_VALUE = PartnerStatus.ACTIVE.name
+_INACTIVE_DB_VALUE = PartnerStatus.INACTIVE.name
+
+
+async def _every(interval: float, job: Job) -> None:
+    """Run `job` every `interval` seconds (first run after one interval)."""
+    while True:
+        await asyncio.sleep(interval)
+        await job()
+
+
+def _seconds_until(hour: int, minute: int, now: datetime = None) -> float:
+    """Seconds from `now` until the next HH:MM UTC."""
+    now = now or datetime.now(timezone.utc)
+    next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def _daily_at(hour: int, minute: int, job: Job) -> None:
+    """Run `job` every day at HH:MM UTC."""
+    while True:
+        await asyncio.sleep(_seconds_until(hour, minute))
+        await job()
+
+
+class Scheduler:
+    """Minimal asyncio scheduler: one task per registered job."""
+
+    def __init__(self) -> None:
+        # job id -> (human-readable name, loop coroutine factory)
+        self._jobs: Dict[str, Tuple[str, Job]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def add_job(self, job_id: str, name: str, runner: Job) -> None:
+        """Register (or replace) a job. Takes effect on the next start()."""
+        self._jobs[job_id] = (name, runner)
+
+    def start(self) -> None:
+        """Start all registered jobs. Must be called inside a running loop."""
+        for job_id, (name, runner) in self._jobs.items():
+            if job_id not in self._tasks:
+                self._tasks[job_id] = asyncio.create_task(runner(), name=name)
+
+    def shutdown(self) -> None:
+        """Cancel all running job tasks."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
 
 
 async def expire_statuses_job() -> None:
@@ -26,7 +90,10 @@ async def expire_statuses_job() -> None:
     Runs every hour to catch any partners whose subscription_end_date has passed.
     """
     try:
-        expired_count = subscription_manager.check_and_expire_statuses()
+        # Blocking ORM work runs in a worker thread, not on the bot's loop
+        expired_count = await asyncio.to_thread(
+            subscription_manager.check_and_expire_statuses
+        )
         if expired_count > 0:
             logger.info(
                 f"[Scheduler] Expired {expired_count} partner status(es) "
@@ -38,47 +105,37 @@ async def expire_statuses_job() -> None:
         logger.error(f"[Scheduler] Error in expire_statuses_job: {e}")
 
 
+def _count_statuses() -> dict:
+    """Partner counts keyed by stored status value."""
+    with get_session() as session:
+        return dict(session.execute(_STATUS_COUNTS_SQL).fetchall())
+
+
 async def daily_summary_job() -> None:
     """
     Periodic job: log daily summary of active vs inactive partners.
     Runs every day at 00:05 UTC.
     """
     try:
-        from database.db import get_session
-        from database.models import Partner, PartnerStatus
-
-        session = get_session()
-        try:
-            active_count = (
-                session.query(Partner)
-                .filter(Partner.status == PartnerStatus.ACTIVE)
-                .count()
-            )
-            inactive_count = (
-                session.query(Partner)
-                .filter(Partner.status == PartnerStatus.INACTIVE)
-                .count()
-            )
-            total = active_count + inactive_count
-            logger.info(
-                f"[Scheduler] Daily summary: "
-                f"Total={total}, Active={active_count}, Inactive={inactive_count}"
-            )
-        finally:
-            session.close()
+        counts = await asyncio.to_thread(_count_statuses)
+        active_count = counts.get(_ACTIVE_DB_VALUE, 0)
+        inactive_count = counts.get(_INACTIVE_DB_VALUE, 0)
+        total = active_count + inactive_count
+        logger.info(
+            f"[Scheduler] Daily summary: "
+            f"Total={total}, Active={active_count}, Inactive={inactive_count}"
+        )
     except Exception as e:
         logger.error(f"[Scheduler] Error in daily_summary_job: {e}")
 
 
-def get_scheduler() -> AsyncIOScheduler:
-    """Get or create the global scheduler instance."""
-    global _scheduler
-    if _scheduler is None:
-        _scheduler = AsyncIOScheduler(timezone="UTC")
-    return _scheduler
+@lru_cache(maxsize=1)
+def get_scheduler() -> Scheduler:
+    """Get or create the global scheduler instance (singleton)."""
+    return Scheduler()
 
 
-def setup_scheduler() -> AsyncIOScheduler:
+def setup_scheduler() -> Scheduler:
     """
     Configure and return the scheduler with all periodic jobs.
     Call this once at startup before starting the scheduler.
@@ -87,22 +144,16 @@ def setup_scheduler() -> AsyncIOScheduler:
 
     # Job 1: Check and expire statuses every hour
     scheduler.add_job(
-        expire_statuses_job,
-        trigger=IntervalTrigger(hours=1),
-        id="expire_statuses",
-        name="Expire partner statuses (Сгорание статуса)",
-        replace_existing=True,
-        max_instances=1,
+        "expire_statuses",
+        "Expire partner statuses (Сгорание статуса)",
+        partial(_every, 3600, expire_statuses_job),
     )
 
     # Job 2: Daily summary at 00:05 UTC
     scheduler.add_job(
-        daily_summary_job,
-        trigger=CronTrigger(hour=0, minute=5, timezone="UTC"),
-        id="daily_summary",
-        name="Daily partner summary",
-        replace_existing=True,
-        max_instances=1,
+        "daily_summary",
+        "Daily partner summary",
+        partial(_daily_at, 0, 5, daily_summary_job),
     )
 
     logger.info(
@@ -112,9 +163,10 @@ def setup_scheduler() -> AsyncIOScheduler:
     return scheduler
 
 
-def start_scheduler() -> AsyncIOScheduler:
+def start_scheduler() -> Scheduler:
     """
     Setup and start the scheduler.
+    Must be called from inside the running event loop.
     Returns the running scheduler instance.
     """
     scheduler = setup_scheduler()
@@ -126,7 +178,8 @@ def start_scheduler() -> AsyncIOScheduler:
 
 def stop_scheduler() -> None:
     """Gracefully stop the scheduler."""
-    global _scheduler
-    if _scheduler and _scheduler.running:
-        _scheduler.shutdown(wait=False)
+    scheduler = get_scheduler()
+    if scheduler.running:
+        scheduler.shutdown()
         logger.info("[Scheduler] Stopped")
+    get_scheduler.cache_clear()
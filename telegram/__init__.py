@@ -1,6 +0,0 @@
-"""Telegram bot module for NANOREM MLM System."""
-
-from .bot import TelegramBot
-from .handlers import setup_handlers
-
-__all__ = ['TelegramBot', 'setup_handlers']
@@ -0,0 +1,11 @@
+"""Shared test setup: point the app at a throwaway SQLite database.
+
+config reads the environment at import time, so the variables have to
+be set before any project module is imported. A BOT_TOKEN is needed for
+notifications to be attempted; tests pass their own mock bot.
+"""
+import os
+import tempfile
+
+os.environ['BOT_TOKEN'] = '123456:test-token'
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/nanorem_test.db"
@@ -0,0 +1,150 @@
+"""Referral -> purchase -> commission flow through the bot handlers."""
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select, update
+
+from database.db import get_session, init_db
+from database.models import Commission, Partner, PartnerStatus
+from tgbot.handlers import (
+    network_handler,
+    purchase_handler,
+    register_handler,
+    start_handler,
+)
+
+
+@pytest.fixture(scope='module')
+def run():
+    """Run coroutines on one loop, so pooled aiosqlite connections stay valid."""
+    init_db()
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+class FakeUser:
+    """A Telegram user with its own user_data, as PTB keeps it per user."""
+
+    def __init__(self, telegram_id: int, name: str):
+        self.user = SimpleNamespace(
+            id=telegram_id, first_name=name, last_name=None, username=None
+        )
+        self.user_data = {}
+        self.bot = SimpleNamespace(send_message=AsyncMock())
+        self.tasks = []
+
+    def call(self, handler, *args):
+        self.update = update = SimpleNamespace(
+            effective_user=self.user,
+            message=SimpleNamespace(reply_text=AsyncMock(), reply_photo=AsyncMock()),
+        )
+        context = SimpleNamespace(
+            args=list(args),
+            user_data=self.user_data,
+            bot_data={'bot_username': 'nanorem_test_bot'},
+            bot=self.bot,
+            application=SimpleNamespace(create_task=self.tasks.append),
+        )
+        return handler(update, context)
+
+
+def _partner(telegram_id: int) -> Partner:
+    with get_session() as session:
+        partner = session.execute(
+            select(Partner).where(Partner.telegram_id == str(telegram_id))
+        ).scalar_one()
+        session.expunge(partner)
+        return partner
+
+
+def _activate(telegram_id: int) -> None:
+    with get_session() as session:
+        session.execute(
+            update(Partner)
+            .where(Partner.telegram_id == str(telegram_id))
+            .values(status=PartnerStatus.ACTIVE)
+        )
+
+
+def test_referral_purchase_pays_sponsor(run):
+    sponsor = FakeUser(700000101, 'Sponsor')
+    buyer = FakeUser(700000102, 'Buyer')
+
+    run(sponsor.call(start_handler))
+    run(sponsor.call(register_handler))
+    _activate(sponsor.user.id)
+
+    run(buyer.call(start_handler, str(sponsor.user.id)))
+    run(buyer.call(register_handler))
+
+    # upline_id holds the sponsor's partners.id, not its Telegram id
+    sponsor_row = _partner(sponsor.user.id)
+    assert _partner(buyer.user.id).upline_id == sponsor_row.id
+    sponsor.bot.send_message.assert_not_awaited()
+    buyer.bot.send_message.assert_awaited_once()
+    assert buyer.bot.send_message.await_args.kwargs['chat_id'] == sponsor.user.id
+
+    run(buyer.call(purchase_handler, '100'))
+
+    with get_session() as session:
+        commissions = session.execute(
+            select(Commission.partner_id, Commission.level, Commission.amount)
+        ).all()
+    assert commissions == [(sponsor_row.id, 1, Decimal('20.00'))]
+    assert _partner(sponsor.user.id).total_commissions == Decimal('20.00')
+    assert _partner(buyer.user.id).total_procurement == Decimal('100.00')
+
+    # The commission notification goes to the sponsor's Telegram chat
+    assert len(buyer.tasks) == 1
+    run(buyer.tasks.pop())
+    assert buyer.bot.send_message.await_count == 2
+    assert str(buyer.bot.send_message.await_args.kwargs['chat_id']) == str(sponsor.user.id)
+
+
+def test_network_counts_referrals_per_level(run):
+    root = FakeUser(700000201, 'Root')
+    run(root.call(start_handler))
+    run(root.call(register_handler))
+
+    # root <- a <- b and root <- c: two partners on line 1, one on line 2
+    a, b, c = (FakeUser(700000202 + i, f'P{i}') for i in range(3))
+    for user, sponsor in ((a, root), (b, a), (c, root)):
+        run(user.call(start_handler, str(sponsor.user.id)))
+        run(user.call(register_handler))
+
+    run(root.call(network_handler))
+
+    reply = root.update.message.reply_text.await_args.args[0]
+    assert "Всего партнёров: *3*" in reply
+    assert "1 линия: *2*" in reply
+    assert "2 линия: *1*" in reply
+
+
+@pytest.mark.parametrize('arg', ['0.001', '-5', 'abc', 'NaN', 'Infinity', '1e15'])
+def test_purchase_rejects_amounts_the_columns_cannot_hold(run, arg):
+    buyer = FakeUser(700000301, 'Rejected')
+    run(buyer.call(register_handler))
+
+    run(buyer.call(purchase_handler, arg))
+
+    buyer.update.message.reply_text.assert_awaited_once_with("Использование: /purchase [сумма]")
+    assert _partner(buyer.user.id).total_procurement == Decimal('0.00')
+
+
+@pytest.mark.parametrize('telegram_id, arg, shown, stored', [
+    (700000401, '1e3', '1000.00', Decimal('1000.00')),
+    (700000402, '0.005', '0.01', Decimal('0.01')),
+    (700000403, '12.344', '12.34', Decimal('12.34')),
+])
+def test_purchase_amount_is_rounded_to_kopecks(run, telegram_id, arg, shown, stored):
+    buyer = FakeUser(telegram_id, 'Rounded')
+    run(buyer.call(register_handler))
+
+    run(buyer.call(purchase_handler, arg))
+
+    assert f"на {shown} руб." in buyer.update.message.reply_text.await_args.args[0]
+    assert _partner(buyer.user.id).total_procurement == stored
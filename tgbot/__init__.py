@@ -0,0 +1,15 @@
+"""Telegram bot module for NANOREM MLM System."""
+
+__all__ = ['TelegramBot', 'setup_handlers']
+
+
+def __getattr__(name):
+    # Resolve exports on first access so importing a submodule such as
+    # tgbot.notifications does not load the whole bot stack
+    if name == 'TelegramBot':
+        from .bot import TelegramBot
+        return TelegramBot
+    if name == 'setup_handlers':
+        from .handlers import setup_handlers
+        return setup_handlers
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
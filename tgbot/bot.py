@@ -0,0 +1,112 @@
+"""Main Telegram Bot class for NANOREM MLM System."""
+import logging
+from urllib.parse import urlsplit
+
+from telegram import Update
+from telegram.ext import AIORateLimiter, Application
+from config import BOT_TOKEN, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_URL
+
+logger = logging.getLogger(__name__)
+
+# Only request update types the bot handles
+_ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+
+class TelegramBot:
+    """Main bot class for NANOREM MLM Telegram Bot."""
+
+    def __init__(self) -> None:
+        """Initialize bot application with token."""
+        if not BOT_TOKEN:
+            raise ValueError("BOT_TOKEN is not set in configuration!")
+
+        self._scheduler = None
+        self._setup_done = False
+
+        self.application: Application = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            # Handle updates from different users in parallel tasks and
+            # keep enough pooled HTTP connections for them
+            .concurrent_updates(True)
+            .connection_pool_size(32)
+            .pool_timeout(10.0)
+            .connect_timeout(5.0)
+            .read_timeout(10.0)
+            # Stay under Telegram's flood limits instead of retrying
+            # after RetryAfter errors
+            .rate_limiter(AIORateLimiter(
+                overall_max_rate=28, overall_time_period=1,
+                group_max_rate=18, group_time_period=60,
+            ))
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
+
+        logger.info("TelegramBot initialized successfully.")
+
+    async def _post_init(self, application: Application) -> None:
+        """Called after application is initialized - start scheduler here."""
+        # Deferred so that constructing the bot does not pull in the DB,
+        # handlers and scheduler stacks until the application starts
+        from database.db import init_db
+        from scheduler import setup_scheduler
+        from .handlers import setup_handlers
+
+        if not self._setup_done:
+            # Application.initialize() has already called getMe; keep the
+            # username where handlers can read it without an API call
+            application.bot_data['bot_username'] = application.bot.username
+            init_db()
+            setup_handlers(application)
+            application.add_error_handler(self._on_error)
+            self._setup_done = True
+
+        self._scheduler = setup_scheduler()
+        if not self._scheduler.running:
+            self._scheduler.start()
+            logger.info("[Scheduler] Started inside event loop successfully")
+
+    async def _on_error(self, update: object, context) -> None:
+        """Log handler exceptions; the dispatcher keeps processing other updates."""
+        logger.error("Error while handling update %s", update, exc_info=context.error)
+
+    async def _post_shutdown(self, application: Application) -> None:
+        """Called on shutdown - stop scheduler."""
+        if self._scheduler and self._scheduler.running:
+            self._scheduler.shutdown()
+            logger.info("[Scheduler] Stopped")
+
+    def run(self) -> None:
+        """Run the bot: webhook mode if WEBHOOK_URL is set, else polling."""
+        if WEBHOOK_URL:
+            self.run_webhook()
+        else:
+            self.run_polling()
+
+    def run_polling(self) -> None:
+        """Run the bot using long polling."""
+        logger.info("Starting NANOREM MLM Bot polling...")
+        self.application.run_polling(
+            drop_pending_updates=True,
+            poll_interval=0.0,
+            # Long poll: Telegram holds getUpdates open for up to 20s
+            timeout=20,
+            bootstrap_retries=-1,
+            allowed_updates=_ALLOWED_UPDATES,
+        )
+
+    def run_webhook(self) -> None:
+        """Run the bot behind a reverse proxy, receiving updates via webhook."""
+        logger.info(f"Starting NANOREM MLM Bot webhook on port {WEBHOOK_PORT}...")
+        self.application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=urlsplit(WEBHOOK_URL).path.lstrip('/'),
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            drop_pending_updates=True,
+            bootstrap_retries=-1,
+            allowed_updates=_ALLOWED_UPDATES,
+        )
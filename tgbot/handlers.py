@@ -0,0 +1,402 @@
+"""Command handlers setup for NANOREM MLM Telegram Bot."""
+import asyncio
+import logging
+import io
+import time
+import qrcode
+from qrcode.image.pure import PyPNGImage
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+from database.db import (
+    ADD_COMMISSION_TOTAL,
+    ADD_PROCUREMENT_TOTAL,
+    get_async_session,
+    get_partner_by_telegram_id_async,
+    get_upline_chain_async,
+)
+from database.models import Partner, Commission, Purchase, PartnerStatus
+from sqlalchemy import bindparam, func, insert, literal, select
+from sqlalchemy.orm import aliased
+from core.commission import CommissionCalculator, MAX_LEVELS
+from core.subscription_manager import subscription_manager
+from .notifications import notify_commissions, notify_new_referral
+
+logger = logging.getLogger(__name__)
+
+# /network and /purchase only need the partner id, not a full Partner object
+_PARTNER_ID_BY_TELEGRAM_ID = select(Partner.id).where(
+    Partner.telegram_id == bindparam('telegram_id')
+)
+
+# Downline size per level for /network: one recursive CTE walks the
+# upline_id tree (upline_id is always the sponsor's partners.id) inside
+# the database, down to MAX_LEVELS
+_network_tree = (
+    select(Partner.id.label('id'), literal(1).label('level'))
+    .where(Partner.upline_id == bindparam('root_id'))
+    .cte('network_tree', recursive=True)
+)
+_downline = aliased(Partner)
+_network_tree = _network_tree.union_all(
+    select(_downline.id, _network_tree.c.level + 1)
+    .where(_downline.upline_id == _network_tree.c.id)
+    .where(_network_tree.c.level < MAX_LEVELS)
+)
+_NETWORK_LEVEL_COUNTS = (
+    select(_network_tree.c.level, func.count())
+    .group_by(_network_tree.c.level)
+)
+
+# /purchase amounts must fit the Numeric(14, 2) money columns
+_MONEY_QUANT = Decimal('0.01')
+_MAX_PURCHASE = Decimal('999999999999.99')
+
+# Rendered referral QR PNGs keyed by Telegram user id; the link only
+# depends on the user id and the bot username, so entries never go stale
+_QR_CACHE_SIZE = 1024
+_qr_cache: dict[int, bytes] = {}
+
+# Static reply texts, built once at import
+
+# /start and /help; only the first name is filled in per call
+_WELCOME_TPL = (
+    "Привет, {name}!"
+    "Добро пожаловать в систему NANOREM MLM.\n"
+    "Используйте команду:\n"
+    "/register - зарегистрироваться в системе\n"
+    "/profile - мой личный кабинет\n"
+    "/network - команда моя\n"
+    "/purchase [сумма] - закупка (тест)\n"
+    "/info - условия начислений\n"
+    "/help - справка"
+)
+_REF_SUFFIX = "\n Вы приглашены ID партнёра: {}"
+
+# /profile caption
+_PROFILE_TPL = (
+    "👤 *Ваш профиль*\n"
+    "🆔 ID: `{uid}`\n"
+    "📊 Статус: {status}{expiry}\n"
+    "💰 Заработано: *{earned:.2f}* руб.\n"
+    "🛒 Личный оборот: *{volume:.2f}* руб.\n"
+    "🔗 Ссылка: `{ref_link}`"
+)
+_STATUS_ACTIVE = "✅ Активен"
+_STATUS_INACTIVE = "❌ Неактивен"
+
+# /info reply (static)
+_INFO_MSG = (
+    "📊 *Маркетинг-план NANOREM*\n"
+    "1 линия: *20%*\n"
+    "2 линия: *10%*\n"
+    "3-5 линии: *5%*\n"
+    "💰 Начисления от суммы закупок.\n"
+    "⚡️ Система компрессии вверх."
+)
+
+
+async def _get_partner_id(
+    session, context: ContextTypes.DEFAULT_TYPE, telegram_id: int
+) -> Optional[int]:
+    """Partner id for a Telegram user, memoized in the user's user_data."""
+    partner_id = context.user_data.get('partner_id')
+    if partner_id is None:
+        result = await session.execute(
+            _PARTNER_ID_BY_TELEGRAM_ID, {'telegram_id': str(telegram_id)}
+        )
+        partner_id = result.scalar_one_or_none()
+        if partner_id is not None:
+            context.user_data['partner_id'] = partner_id
+    return partner_id
+
+
+async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /start command with referral support."""
+    user = update.effective_user
+    args = context.args
+
+    ref_id = None
+    if args:
+        try:
+            ref_id = int(args[0])
+        except ValueError:
+            pass
+        else:
+            context.user_data['referrer_telegram_id'] = ref_id
+            logger.info(f"User {user.id} came via referral link {ref_id}")
+
+    msg = _WELCOME_TPL.format(name=user.first_name)
+    if ref_id:
+        msg += _REF_SUFFIX.format(ref_id)
+    await update.message.reply_text(msg)
+
+
+async def register_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Register a new partner in the system."""
+    user = update.effective_user
+    # /start stores the referrer's Telegram id; upline_id holds partners.id
+    upline_telegram_id = context.user_data.get('referrer_telegram_id')
+
+    async with get_async_session() as session:
+        partner = await get_partner_by_telegram_id_async(session, user.id)
+        if partner:
+            context.user_data['partner_id'] = partner.id
+            await update.message.reply_text("Вы уже зарегистрированы!")
+            return
+
+        upline_id = None
+        if upline_telegram_id:
+            result = await session.execute(
+                _PARTNER_ID_BY_TELEGRAM_ID, {'telegram_id': str(upline_telegram_id)}
+            )
+            upline_id = result.scalar_one_or_none()
+            if upline_id is None:
+                logger.warning(
+                    f"User {user.id} referred by unknown Telegram id {upline_telegram_id}"
+                )
+
+        new_partner = Partner(
+            telegram_id=str(user.id),
+            first_name=user.first_name or "",
+            last_name=user.last_name,
+            username=user.username,
+            upline_id=upline_id,
+        )
+        session.add(new_partner)
+
+        if upline_id is not None:
+            await notify_new_referral(
+                upline_telegram_id, user.first_name or user.username, context.bot
+            )
+
+    context.user_data['partner_id'] = new_partner.id
+    bot_username = context.bot_data['bot_username']
+    ref_link = f"https://t.me/{bot_username}?start={user.id}"
+
+    await update.message.reply_text(
+        "🎉 Регистрация успешно завершена!\n"
+        f"Ваша реферальная ссылка: `{ref_link}`",
+        parse_mode='Markdown'
+    )
+
+
+async def purchase_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Perform a purchase manually for testing."""
+    user = update.effective_user
+    try:
+        amount = Decimal(context.args[0])
+    except (IndexError, InvalidOperation):
+        amount = None
+    if amount is not None and amount.is_finite() and amount <= _MAX_PURCHASE:
+        # Commissions are computed on exactly what the columns store
+        amount = amount.quantize(_MONEY_QUANT, rounding=ROUND_HALF_UP)
+    else:
+        amount = None
+    if amount is None or amount <= 0:
+        await update.message.reply_text("Использование: /purchase [сумма]")
+        return
+
+    notify_targets = []
+    async with get_async_session() as session:
+        partner_id = await _get_partner_id(session, context, user.id)
+        if partner_id is None:
+            await update.message.reply_text("Сначала зарегистрируйтесь: /register")
+            return
+
+        purchase = Purchase(
+            purchase_number=f"TEST-{user.id}-{int(time.time())}",
+            partner_id=partner_id,
+            amount=amount,
+            status="paid"
+        )
+        session.add(purchase)
+        await session.flush()
+        await session.execute(
+            ADD_PROCUREMENT_TOTAL, {'partner_id_': partner_id, 'amount': amount}
+        )
+
+        upline_chain = await get_upline_chain_async(session, partner_id)
+        commissions = CommissionCalculator().calculate_purchase_commissions(
+            purchase_amount=amount,
+            buying_partner_id=partner_id,
+            upline_chain=upline_chain
+        )
+
+        if commissions:
+            # One executemany INSERT and one executemany UPDATE for all levels
+            await session.execute(insert(Commission), [
+                {
+                    'partner_id': c.partner_id,
+                    'purchase_id': purchase.id,
+                    'source_partner_id': partner_id,
+                    'level': c.level,
+                    'rate': c.rate,
+                    'base_amount': c.base_amount,
+                    'amount': c.amount,
+                    'is_compressed': c.compressed,
+                    'notes': c.notes,
+                }
+                for c in commissions
+            ])
+            await session.execute(ADD_COMMISSION_TOTAL, [
+                {'partner_id_': c.partner_id, 'amount': c.amount}
+                for c in commissions
+            ])
+
+            result = await session.execute(
+                select(Partner.id, Partner.telegram_id)
+                .where(Partner.id.in_({c.partner_id for c in commissions}))
+            )
+            telegram_ids = dict(result.all())
+            notify_targets = [
+                (telegram_ids.get(c.partner_id), c.amount, c.level) for c in commissions
+            ]
+
+    # Fire-and-forget once committed: the reply does not wait for
+    # Telegram round-trips to every upline partner
+    if notify_targets:
+        context.application.create_task(
+            notify_commissions(notify_targets, user.username or user.first_name, context.bot)
+        )
+
+    await update.message.reply_text(
+        f"✅ Закупка на {amount:.2f} руб. внесена! Комиссии распределены."
+    )
+
+
+async def network_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show user's referral network structure."""
+    user = update.effective_user
+    async with get_async_session() as session:
+        partner_id = await _get_partner_id(session, context, user.id)
+        if partner_id is None:
+            await update.message.reply_text("Сначала зарегистрируйтесь: /register")
+            return
+
+        level_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        result = await session.execute(_NETWORK_LEVEL_COUNTS, {'root_id': partner_id})
+        level_counts.update(result.all())
+
+        total_team = sum(level_counts.values())
+        msg = (
+            f"👥 *Ваша команда*\n"
+            f"Всего партнёров: *{total_team}*\n"
+            f"1 линия: *{level_counts[1]}*\n"
+            f"2 линия: *{level_counts[2]}*\n"
+            f"3 линия: *{level_counts[3]}*\n"
+            f"4 линия: *{level_counts[4]}*\n"
+            f"5 линия: *{level_counts[5]}*"
+        )
+    await update.message.reply_text(msg, parse_mode='Markdown')
+
+
+def _render_qr(ref_link: str) -> bytes:
+    """Render the referral link as a PNG QR code."""
+    # PyPNG writes the PNG directly, without building a PIL image first
+    qr = qrcode.QRCode(version=1, box_size=10, border=5, image_factory=PyPNGImage)
+    qr.add_data(ref_link)
+    qr.make(fit=True)
+
+    bio = io.BytesIO()
+    qr.make_image().save(bio)
+    return bio.getvalue()
+
+
+async def profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show partner profile, stats, subscription status and referral QR code."""
+    user = update.effective_user
+    async with get_async_session() as session:
+        partner = await get_partner_by_telegram_id_async(session, user.id)
+        if not partner:
+            await update.message.reply_text("Вы не зарегистрированы.")
+            return
+
+        # Running totals kept up to date on every purchase
+        total_earned = partner.total_commissions or 0
+        personal_volume = partner.total_procurement or 0
+
+        # Subscription status
+        is_active = partner.status == PartnerStatus.ACTIVE
+
+        # Days until expiry
+        expiry_text = ""
+        if is_active and partner.subscription_end_date:
+            days_left = (partner.subscription_end_date - datetime.utcnow()).days
+            if days_left > 0:
+                expiry_text = f"\n⏳ Статус действует ещё: *{days_left}* дн."
+            elif days_left == 0:
+                expiry_text = "\n⚠️ Статус истекает сегодня!"
+            else:
+                expiry_text = "\n🔴 Статус истёк, требуется продление."
+
+        bot_username = context.bot_data['bot_username']
+        ref_link = f"https://t.me/{bot_username}?start={user.id}"
+
+        msg = _PROFILE_TPL.format_map({
+            'uid': user.id,
+            'status': _STATUS_ACTIVE if is_active else _STATUS_INACTIVE,
+            'expiry': expiry_text,
+            'earned': total_earned,
+            'volume': personal_volume,
+            'ref_link': ref_link,
+        })
+
+    png = _qr_cache.get(user.id)
+    if png is None:
+        # QR rendering is CPU-bound; keep it off the event loop
+        png = await asyncio.to_thread(_render_qr, ref_link)
+        if len(_qr_cache) >= _QR_CACHE_SIZE:
+            del _qr_cache[next(iter(_qr_cache))]
+        _qr_cache[user.id] = png
+
+    bio = io.BytesIO(png)
+    bio.name = 'referral_qr.png'
+    await update.message.reply_photo(
+        photo=bio,
+        caption=msg,
+        parse_mode='Markdown'
+    )
+
+
+def _activate_status(telegram_id: str) -> Optional[int]:
+    """Activate partner status; return days left, or None if not registered."""
+    if not subscription_manager.activate_status(telegram_id):
+        return None
+    return subscription_manager.get_days_until_expiry(telegram_id)
+
+
+async def activate_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Activate partner status for 30 days (admin or test command)."""
+    user = update.effective_user
+    # subscription_manager uses blocking sessions; keep them off the loop
+    days_left = await asyncio.to_thread(_activate_status, str(user.id))
+    if days_left is not None:
+        await update.message.reply_text(
+            f"✅ Ваш статус активирован на {days_left} дн!"
+        )
+    else:
+        await update.message.reply_text(
+            "❌ Не удалось активировать статус. Сначала зарегистрируйтесь: /register"
+        )
+
+
+async def info_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Display marketing plan information."""
+    await update.message.reply_text(_INFO_MSG, parse_mode='Markdown')
+
+
+def setup_handlers(app: Application) -> None:
+    """Register all command handlers (called once from TelegramBot._post_init)."""
+    app.add_handlers([
+        CommandHandler(["start", "help"], start_handler),
+        CommandHandler("register", register_handler),
+        CommandHandler("purchase", purchase_handler),
+        CommandHandler("network", network_handler),
+        CommandHandler("profile", profile_handler),
+        CommandHandler("activate", activate_handler),
+        CommandHandler("info", info_handler),
+    ])
@@ -1,5 +1,8 @@
 """Telegram notification helpers for NANOREM MLM Bot."""
+import asyncio
 import logging
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
 from telegram import Bot
 from telegram.error import TelegramError
 from database.db import get_session
@@ -9,8 +12,21 @@ from config import BOT_TOKEN
 logger = logging.getLogger(__name__)
 
 
-async def notify_commission(partner_telegram_id: int, amount: float, level: int, buyer_name: str) -> None:
-    """Send a commission notification to a partner."""
+@lru_cache(maxsize=1)
+def _get_bot() -> Bot:
+    """Shared Bot instance, so every notification reuses one HTTP connection pool."""
+    return Bot(token=BOT_TOKEN)
+
+
+async def notify_commission(
+    partner_telegram_id: int, amount: float, level: int, buyer_name: str,
+    bot: Optional[Bot] = None,
+) -> None:
+    """Send a commission notification to a partner.
+
+    Pass the application's ``context.bot`` when available so the send
+    goes through its rate limiter; otherwise the shared module Bot is used.
+    """
     if not partner_telegram_id or not BOT_TOKEN:
         return
 
@@ -22,8 +38,7 @@ async def notify_commission(partner_telegram_id: int, amount: float, level: int,
     )
 
     try:
-        bot = Bot(token=BOT_TOKEN)
-        await bot.send_message(
+        await (bot or _get_bot()).send_message(
             chat_id=partner_telegram_id,
             text=msg,
             parse_mode='Markdown'
@@ -33,7 +48,26 @@ async def notify_commission(partner_telegram_id: int, amount: float, level: int,
         logger.warning(f"Failed to notify {partner_telegram_id}: {e}")
 
 
-async def notify_new_referral(upline_telegram_id: int, new_partner_name: str) -> None:
+async def notify_commissions(
+    notifications: Iterable[Tuple[int, float, int]], buyer_name: str,
+    bot: Optional[Bot] = None,
+) -> None:
+    """Send (telegram_id, amount, level) commission notifications concurrently."""
+    results = await asyncio.gather(
+        *(
+            notify_commission(telegram_id, amount, level, buyer_name, bot)
+            for telegram_id, amount, level in notifications
+        ),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"Commission notification failed: {result}")
+
+
+async def notify_new_referral(
+    upline_telegram_id: int, new_partner_name: str, bot: Optional[Bot] = None,
+) -> None:
     """Notify an upline partner that a new partner registered via their link."""
     if not upline_telegram_id or not BOT_TOKEN:
         return
@@ -44,8 +78,7 @@ async def notify_new_referral(upline_telegram_id: int, new_partner_name: str) ->
     )
 
     try:
-        bot = Bot(token=BOT_TOKEN)
-        await bot.send_message(
+        await (bot or _get_bot()).send_message(
             chat_id=upline_telegram_id,
             text=msg,
             parse_mode='Markdown'
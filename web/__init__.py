@@ -1,12 +1,13 @@
 """Web integration module for nanorvs.ru website."""
 
-from .api_client import NanorvsAPIClient
+from .api_client import NanorvsAPIClient, create_session
 from .catalog_sync import CatalogSync
 from .order_handler import OrderHandler
 from .webhook import WebhookHandler
 
 __all__ = [
     'NanorvsAPIClient',
+    'create_session',
     'CatalogSync',
     'OrderHandler',
     'WebhookHandler'
@@ -1,35 +1,140 @@
 """API Client for nanorvs.ru website integration."""
 
+import hashlib
 import logging
+import time
+import ijson
+import orjson
 import requests
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Pooled keep-alive connections, so concurrent catalog syncs reuse
+# TCP/TLS sessions instead of reopening them
+POOL_CONNECTIONS = 20
+POOL_MAXSIZE = 100
+
+# Seconds a fetched catalog is served from memory; products change on
+# an hourly/daily scale
+PRODUCTS_CACHE_TTL = 60
+
+# Products per request for paged catalog fetches
+PRODUCTS_PAGE_SIZE = 500
+
+# Retry transient gateway errors with a short backoff. Only GETs are
+# resent after a read error or 502/503/504: a POST may already have been
+# stored when the gateway times out. Connect errors (nothing sent yet)
+# are retried for every method.
+_RETRY = Retry(
+    total=2,
+    backoff_factor=0.2,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset(["GET"]),
+)
+
+
+def _idempotency_headers(scope: str, *ids: Any) -> Optional[Dict[str, str]]:
+    """Idempotency-Key header derived from the ids a POST is about.
+    
+    The same ids always give the same key, so nanorvs.ru can drop a
+    resend (e.g. a WebhookHandler retry) of a request it already stored.
+    None when no id is known.
+    """
+    ids = sorted(str(i) for i in ids if i is not None)
+    if not ids:
+        return None
+    digest = hashlib.sha256(','.join(ids).encode()).hexdigest()
+    return {'Idempotency-Key': f"{scope}-{digest}"}
+
+
+def create_session() -> requests.Session:
+    """Create a requests session with pooled keep-alive connections and retries.
+    
+    Pass one session to every NanorvsAPIClient in the process so catalog
+    sync, order and webhook calls all reuse the same TCP/TLS connections.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=_RETRY,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _BearerAuth(AuthBase):
+    """Attach an API key to each request of one client.
+
+    Auth is passed per request rather than set in the session headers,
+    since the session may be shared by clients with different keys.
+    """
+
+    def __init__(self, api_key: str):
+        self.header = f'Bearer {api_key}'
+
+    def __call__(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        request.headers['Authorization'] = self.header
+        return request
+
 
 class NanorvsAPIClient:
     """Client for interacting with nanorvs.ru API."""
     
-    def __init__(self, base_url: str = "https://nanorvs.ru", api_key: Optional[str] = None):
+    def __init__(self, base_url: str = "https://nanorvs.ru", api_key: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
         """Initialize API client.
         
         Args:
             base_url: Base URL for nanorvs.ru
             api_key: API key for authentication (if required)
+            session: Shared pooled session (see create_session); a new
+                one is created when omitted
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.session = requests.Session()
-        
-        if api_key:
-            self.session.headers.update({
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            })
+        self.session = session or create_session()
+        # Content-Type is set by requests for json= bodies
+        self.auth = _BearerAuth(api_key) if api_key else None
+
+        # category -> (fetched_at, products); never handed out directly
+        self._products_cache: Dict[Optional[str], Tuple[float, Tuple[Dict[str, Any], ...]]] = {}
         
         logger.info(f"Initialized NanorvsAPIClient for {base_url}")
     
+    def iter_products(self, category: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream product catalog from nanorvs.ru.
+        
+        Products are parsed incrementally from the response body, so
+        memory stays flat for large catalogs and callers may stop early.
+        
+        Args:
+            category: Optional category filter
+            
+        Yields:
+            Product dicts, one at a time
+            
+        Raises:
+            requests.exceptions.RequestException: On HTTP errors
+            ijson.JSONError: On malformed response body
+        """
+        endpoint = f"{self.base_url}/api/products"
+        params = {}
+        if category:
+            params['category'] = category
+        
+        with self.session.get(endpoint, params=params, stream=True, auth=self.auth, timeout=10) as response:
+            response.raise_for_status()
+            # Let urllib3 undo Content-Encoding on the raw stream
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, 'item', use_float=True)
+    
     def get_products(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get product catalog from nanorvs.ru.
         
@@ -37,25 +142,57 @@ class NanorvsAPIClient:
             category: Optional category filter
             
         Returns:
-            List of products with details
+            List of products with details; a fresh copy on every call,
+            so callers may modify it and its entries
         """
+        now = time.monotonic()
+        cached = self._products_cache.get(category)
+        if cached and now - cached[0] < PRODUCTS_CACHE_TTL:
+            return [dict(product) for product in cached[1]]
+
         try:
-            endpoint = f"{self.base_url}/api/products"
-            params = {}
-            if category:
-                params['category'] = category
-            
-            response = self.session.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
-            
-            products = response.json()
+            products = tuple(self.iter_products(category))
             logger.info(f"Retrieved {len(products)} products from nanorvs.ru")
-            return products
+            self._products_cache[category] = (now, products)
+            return [dict(product) for product in products]
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ijson.JSONError) as e:
             logger.error(f"Failed to get products: {e}")
             return []
     
+    def get_products_page(self, offset: int = 0, limit: int = PRODUCTS_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Get one page of the product catalog from nanorvs.ru.
+        
+        The endpoint returns the same bare JSON array as iter_products,
+        sliced by offset/limit; a page shorter than limit is the last one.
+        Errors are raised rather than returned as an empty page, which
+        would look like the end of the catalog.
+        
+        Args:
+            offset: Index of the first product to return
+            limit: Maximum number of products to return
+            
+        Returns:
+            Products on this page
+            
+        Raises:
+            requests.exceptions.RequestException: On HTTP errors
+            ValueError: On a malformed or non-array response body
+        """
+        endpoint = f"{self.base_url}/api/products"
+        params = {'offset': offset, 'limit': limit}
+        
+        response = self.session.get(endpoint, params=params, auth=self.auth, timeout=10)
+        response.raise_for_status()
+        
+        # orjson parses the (transparently decompressed) body in C;
+        # orjson.JSONDecodeError is a ValueError
+        products = orjson.loads(response.content)
+        if not isinstance(products, list):
+            raise ValueError(f"Expected a product array at offset {offset}")
+        logger.debug("Retrieved %d products at offset %d", len(products), offset)
+        return products
+    
     def get_product_details(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed information about specific product.
         
@@ -67,7 +204,7 @@ class NanorvsAPIClient:
         """
         try:
             endpoint = f"{self.base_url}/api/products/{product_id}"
-            response = self.session.get(endpoint, timeout=10)
+            response = self.session.get(endpoint, auth=self.auth, timeout=10)
             response.raise_for_status()
             
             product = response.json()
@@ -78,6 +215,29 @@ class NanorvsAPIClient:
             logger.error(f"Failed to get product {product_id}: {e}")
             return None
     
+    def get_products_details(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get detailed information about several products in one request.
+        
+        Args:
+            product_ids: Product identifiers
+            
+        Returns:
+            List of product details (missing products are omitted)
+        """
+        try:
+            endpoint = f"{self.base_url}/api/products"
+            params = {'ids': ','.join(map(str, product_ids))}
+            response = self.session.get(endpoint, params=params, auth=self.auth, timeout=10)
+            response.raise_for_status()
+            
+            products = response.json()
+            logger.info(f"Retrieved details for {len(products)} products")
+            return products
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get products {product_ids}: {e}")
+            return []
+    
     def create_order(self, order_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create new order on nanorvs.ru.
         
@@ -89,7 +249,9 @@ class NanorvsAPIClient:
         """
         try:
             endpoint = f"{self.base_url}/api/orders"
-            response = self.session.post(endpoint, json=order_data, timeout=10)
+            headers = _idempotency_headers('order', order_data.get('id'))
+            response = self.session.post(endpoint, json=order_data, headers=headers,
+                                         auth=self.auth, timeout=10)
             response.raise_for_status()
             
             order = response.json()
@@ -111,7 +273,7 @@ class NanorvsAPIClient:
         """
         try:
             endpoint = f"{self.base_url}/api/orders/{order_id}"
-            response = self.session.get(endpoint, timeout=10)
+            response = self.session.get(endpoint, auth=self.auth, timeout=10)
             response.raise_for_status()
             
             order = response.json()
@@ -134,7 +296,9 @@ class NanorvsAPIClient:
         """
         try:
             endpoint = f"{self.base_url}/api/partners/{partner_id}/sales"
-            response = self.session.post(endpoint, json=sale_data, timeout=10)
+            headers = _idempotency_headers(f'sales-{partner_id}', sale_data.get('order_id'))
+            response = self.session.post(endpoint, json=sale_data, headers=headers,
+                                         auth=self.auth, timeout=10)
             response.raise_for_status()
             
             logger.info(f"Reported sale for partner {partner_id}")
@@ -144,6 +308,32 @@ class NanorvsAPIClient:
             logger.error(f"Failed to report sale: {e}")
             return False
     
+    def update_partner_sales_bulk(self, partner_id: str, sales: List[Dict[str, Any]]) -> bool:
+        """Report several partner sales to nanorvs.ru in one request.
+        
+        Args:
+            partner_id: Partner identifier
+            sales: Sale information list
+            
+        Returns:
+            True if successful
+        """
+        try:
+            endpoint = f"{self.base_url}/api/partners/{partner_id}/sales/bulk"
+            headers = _idempotency_headers(
+                f'sales-{partner_id}', *(sale.get('order_id') for sale in sales)
+            )
+            response = self.session.post(endpoint, json={'sales': sales}, headers=headers,
+                                         auth=self.auth, timeout=10)
+            response.raise_for_status()
+            
+            logger.info(f"Reported {len(sales)} sales for partner {partner_id}")
+            return True
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to report sales: {e}")
+            return False
+    
     def get_partner_stats(self, partner_id: str) -> Optional[Dict[str, Any]]:
         """Get partner statistics from nanorvs.ru.
         
@@ -155,7 +345,7 @@ class NanorvsAPIClient:
         """
         try:
             endpoint = f"{self.base_url}/api/partners/{partner_id}/stats"
-            response = self.session.get(endpoint, timeout=10)
+            response = self.session.get(endpoint, auth=self.auth, timeout=10)
             response.raise_for_status()
             
             stats = response.json()
@@ -173,7 +363,7 @@ class NanorvsAPIClient:
             True if connection successful
         """
         try:
-            response = self.session.get(f"{self.base_url}/api/health", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/health", auth=self.auth, timeout=5)
             return response.status_code == 200
         except:
             return False
@@ -1,13 +1,25 @@
 """Catalog synchronization module for nanorvs.ru products."""
 
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Any, Optional
 from datetime import datetime
-from .api_client import NanorvsAPIClient
+from .api_client import NanorvsAPIClient, PRODUCTS_PAGE_SIZE
 from database.db import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# Catalog pages fetched in parallel during a full sync
+SYNC_FETCH_WORKERS = 8
+
+# API product fields in one C-level lookup (see _product_row)
+_PRODUCT_FIELDS = itemgetter('id', 'name', 'price', 'description', 'category')
+
+# Products buffered before each upsert; caps memory during a full sync
+SYNC_BATCH_SIZE = 1000
+
 
 class CatalogSync:
     """Synchronize product catalog from nanorvs.ru to local database."""
@@ -21,37 +33,100 @@ class CatalogSync:
         """
         self.api_client = api_client
         self.db_manager = db_manager
+        
+        # Served by check_sync_status without touching the database;
+        # total_products is None until (re)counted on the next status call
+        self._status: Dict[str, Any] = {
+            'last_sync': None,
+            'total_products': None,
+            'sync_status': 'ready'
+        }
+        self._status_lock = threading.Lock()
         logger.info("Initialized CatalogSync")
     
+    def _set_status(self, **changes: Any) -> None:
+        """Update cached sync status fields."""
+        with self._status_lock:
+            self._status.update(changes)
+    
     def sync_all_products(self) -> bool:
         """Synchronize all products from nanorvs.ru.
         
+        Sets sync_status to 'ready' only when every received product was
+        stored; 'partial' when some were rejected or failed to store, and
+        'error' when the fetch failed or nothing was received.
+        
         Returns:
             True if sync successful
         """
+        self._set_status(sync_status='syncing')
         try:
             logger.info("Starting full product catalog sync...")
             
-            # Get all products from nanorvs.ru
-            products = self.api_client.get_products()
+            # Stream pages from nanorvs.ru, upserting every SYNC_BATCH_SIZE products
+            received = 0
+            synced_count = 0
+            buffer: List[Dict[str, Any]] = []
+            for page in self._iter_product_pages():
+                received += len(page)
+                buffer.extend(page)
+                if len(buffer) >= SYNC_BATCH_SIZE:
+                    synced_count += self._store_products_bulk(buffer)
+                    buffer.clear()
+            if buffer:
+                synced_count += self._store_products_bulk(buffer)
             
-            if not products:
+            if not received:
                 logger.warning("No products received from nanorvs.ru")
+                self._set_status(sync_status='error')
                 return False
             
-            # Store products in database
-            synced_count = 0
-            for product in products:
-                if self._store_product(product):
-                    synced_count += 1
+            if synced_count < received:
+                logger.warning(f"Synced only {synced_count}/{received} products")
+                self._set_status(sync_status='partial')
+                return False
             
-            logger.info(f"Successfully synced {synced_count}/{len(products)} products")
+            logger.info(f"Successfully synced {synced_count}/{received} products")
+            self._set_status(sync_status='ready')
             return True
             
         except Exception as e:
             logger.error(f"Failed to sync products: {e}")
+            self._set_status(sync_status='error')
             return False
     
+    def _iter_product_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the full catalog page by page.
+        
+        The catalog size is not known up front, so after the first page
+        the next SYNC_FETCH_WORKERS pages are requested concurrently,
+        overlapping their network latency, until a short page ends it.
+        
+        Yields:
+            Lists of products, one per page, in catalog order
+            
+        Raises:
+            Whatever get_products_page raises for a failed page, so a
+            partial catalog is never taken for a complete one
+        """
+        def fetch(offset: int) -> List[Dict[str, Any]]:
+            return self.api_client.get_products_page(offset, PRODUCTS_PAGE_SIZE)
+        
+        page = fetch(0)
+        yield page
+        if len(page) < PRODUCTS_PAGE_SIZE:
+            return
+        
+        wave = SYNC_FETCH_WORKERS * PRODUCTS_PAGE_SIZE
+        offset = PRODUCTS_PAGE_SIZE
+        with ThreadPoolExecutor(max_workers=SYNC_FETCH_WORKERS) as executor:
+            while True:
+                for page in executor.map(fetch, range(offset, offset + wave, PRODUCTS_PAGE_SIZE)):
+                    yield page
+                    if len(page) < PRODUCTS_PAGE_SIZE:
+                        return
+                offset += wave
+    
     def sync_product(self, product_id: str) -> bool:
         """Synchronize specific product.
         
@@ -68,41 +143,94 @@ class CatalogSync:
                 logger.warning(f"Product {product_id} not found")
                 return False
             
-            return self._store_product(product)
+            return self._store_products_bulk([product]) == 1
             
         except Exception as e:
             logger.error(f"Failed to sync product {product_id}: {e}")
             return False
     
-    def _store_product(self, product: Dict[str, Any]) -> bool:
-        """Store product in database.
+    def sync_products(self, product_ids: List[str]) -> int:
+        """Synchronize several products with one API request and one upsert.
         
         Args:
-            product: Product data
+            product_ids: Product identifiers
             
         Returns:
-            True if stored successfully
+            Number of products stored
         """
         try:
-            # TODO: Implement database storage logic
-            # This will be connected to database models
+            products = self.api_client.get_products_details(product_ids)
+            
+            if not products:
+                logger.warning(f"Products {product_ids} not found")
+                return 0
             
+            return self._store_products_bulk(products)
+            
+        except Exception as e:
+            logger.error(f"Failed to sync products {product_ids}: {e}")
+            return 0
+    
+    def _product_row(self, product: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Map an API product to a products table row.
+        
+        Args:
+            product: Product data
+            
+        Returns:
+            Row dict for DatabaseManager.upsert_products, or None if the
+            product has no id or name
+        """
+        try:
+            product_id, name, price, description, category = _PRODUCT_FIELDS(product)
+        except KeyError:
+            # Some optional fields are absent; look them up one by one
             product_id = product.get('id')
             name = product.get('name')
             price = product.get('price')
             description = product.get('description')
             category = product.get('category')
+        
+        if product_id is None or not name:
+            return None
+        
+        logger.debug("Storing product: %s (ID: %s)", name, product_id)
+        
+        return {
+            'ext_id': str(product_id),
+            'name': name,
+            'price': price,
+            'description': description,
+            'category': category,
+        }
+    
+    def _store_products_bulk(self, products: List[Dict[str, Any]]) -> int:
+        """Store products in database with a single upsert.
+        
+        Args:
+            products: Product data list
             
-            logger.debug(f"Storing product: {name} (ID: {product_id})")
-            
-            # Placeholder for database insert/update
-            # db_manager.upsert_product(product)
-            
-            return True
+        Returns:
+            Number of products stored (repeats of one product all count)
+        """
+        try:
+            # One row per ext_id (last one wins): PostgreSQL rejects an
+            # ON CONFLICT upsert that touches the same key twice, and
+            # paging over a changing catalog can repeat products
+            rows = {}
+            valid = 0
+            for row in map(self._product_row, products):
+                if row is not None:
+                    rows[row['ext_id']] = row
+                    valid += 1
+            if not self.db_manager.upsert_products(list(rows.values())):
+                return 0
+            self._set_status(last_sync=datetime.utcnow(), total_products=None)
+            return valid
             
         except Exception as e:
-            logger.error(f"Failed to store product: {e}")
-            return False
+            logger.error(f"Failed to store products: {e}")
+            return 0
     
     def get_local_products(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get products from local database.
@@ -131,14 +259,11 @@ class CatalogSync:
             Sync status information
         """
         try:
-            # TODO: Implement sync status check
-            status = {
-                'last_sync': None,
-                'total_products': 0,
-                'sync_status': 'ready'
-            }
-            
-            return status
+            with self._status_lock:
+                if self._status['total_products'] is None:
+                    # Only after a write; other polls are served from memory
+                    self._status['total_products'] = self.db_manager.count_products()
+                return dict(self._status)
             
         except Exception as e:
             logger.error(f"Failed to check sync status: {e}")
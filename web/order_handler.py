@@ -1,11 +1,13 @@
 """Order handling module for nanorvs.ru integration."""
 
 import logging
-from typing import Dict, Any, Optional
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from .api_client import NanorvsAPIClient
 from core.partner_manager import PartnerManager
 from core.commission import CommissionCalculator
+from database.db import UPLINE_SCAN_DEPTH
 
 logger = logging.getLogger(__name__)
 
@@ -21,31 +23,66 @@ class OrderHandler:
         self.commission_calculator = commission_calculator
         logger.info("Initialized OrderHandler")
     
+    def process_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process a batch of orders, reporting sales once per partner.
+        
+        Returns:
+            Orders that could not be processed (empty when all succeeded),
+            so the caller can retry them
+        """
+        failed: List[Dict[str, Any]] = []
+        # partner -> [(order_data, sales update), ...]
+        updates_by_partner: Dict[Any, List[Tuple[Dict[str, Any], Dict[str, Any]]]] = defaultdict(list)
+        # Upline chains are resolved once per partner for the whole batch
+        upline_chains: Dict[Any, List[Tuple[int, bool]]] = {}
+        
+        for order_data in orders:
+            try:
+                order_id = order_data.get('id')
+                partner_id = order_data.get('partner_id')
+                amount = order_data.get('total_amount', 0)
+                
+                logger.info("Processing order %s for partner %s", order_id, partner_id)
+                
+                upline_chain = upline_chains.get(partner_id)
+                if upline_chain is None:
+                    # Same depth as the DB chain, so compression behaves alike
+                    upline_chain = self.partner_manager.get_upline_chain(
+                        partner_id, UPLINE_SCAN_DEPTH
+                    )
+                    upline_chains[partner_id] = upline_chain
+                
+                # Calculate commissions
+                records = self.commission_calculator.calculate_purchase_commissions(
+                    purchase_amount=amount,
+                    buying_partner_id=partner_id,
+                    upline_chain=upline_chain
+                )
+                commissions = [
+                    {'partner_id': r.partner_id, 'level': r.level, 'amount': str(r.amount)}
+                    for r in records
+                ]
+                
+                updates_by_partner[partner_id].append((order_data, {
+                    'order_id': order_id,
+                    'amount': amount,
+                    'commissions': commissions
+                }))
+                
+            except Exception as e:
+                logger.error(f"Failed to process order: {e}")
+                failed.append(order_data)
+        
+        # One sales report per partner instead of one per order
+        for partner_id, entries in updates_by_partner.items():
+            updates = [update for _, update in entries]
+            if self.api_client.update_partner_sales_bulk(partner_id, updates):
+                logger.info("Successfully processed %d order(s) for partner %s", len(updates), partner_id)
+            else:
+                failed.extend(order_data for order_data, _ in entries)
+        
+        return failed
+    
     def process_order(self, order_data: Dict[str, Any]) -> bool:
         """Process order and calculate MLM commissions."""
-        try:
-            order_id = order_data.get('id')
-            partner_id = order_data.get('partner_id')
-            amount = order_data.get('total_amount', 0)
-            
-            logger.info(f"Processing order {order_id} for partner {partner_id}")
-            
-            # Calculate commissions
-            commissions = self.commission_calculator.calculate(
-                partner_id=partner_id,
-                sale_amount=amount
-            )
-            
-            # Update partner sales
-            self.api_client.update_partner_sales(partner_id, {
-                'order_id': order_id,
-                'amount': amount,
-                'commissions': commissions
-            })
-            
-            logger.info(f"Successfully processed order {order_id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to process order: {e}")
-            return False
+        return not self.process_orders([order_data])
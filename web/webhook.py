@@ -1,63 +1,235 @@
 """Webhook handler for nanorvs.ru notifications."""
 
+import atexit
 import logging
-import hmac
-import hashlib
-from typing import Dict, Any, Optional
+import queue
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, hmac
+from database.db import DatabaseManager
+from .catalog_sync import CatalogSync
 from .order_handler import OrderHandler
 
 logger = logging.getLogger(__name__)
 
+# Order and product events are acknowledged as soon as they are queued;
+# a worker thread drains the queue in batches, so bursts coalesce into
+# one OrderHandler call and one catalog fetch
+EVENT_QUEUE_SIZE = 10_000
+EVENT_BATCH_SIZE = 100
+EVENT_BATCH_WAIT = 0.05  # seconds to wait for more events before flushing
+
+# Orders that fail are retried with exponential backoff, then stored as
+# dead letters (FailedOrder) instead of being dropped
+ORDER_MAX_ATTEMPTS = 4
+ORDER_RETRY_DELAY = 0.5  # seconds before the first retry; doubles each time
+
+# Queued item kinds
+_ORDER = 'order'
+_PRODUCT = 'product'
+_STOP = object()
+
+# Hex-encoded HMAC-SHA256 signature length
+SIGNATURE_HEX_LENGTH = 64
+
 
 class WebhookHandler:
     """Handle webhook notifications from nanorvs.ru."""
     
-    def __init__(self, order_handler: OrderHandler, webhook_secret: Optional[str] = None):
+    def __init__(self, order_handler: OrderHandler, webhook_secret: Optional[str] = None,
+                 catalog_sync: Optional[CatalogSync] = None,
+                 db_manager: Optional[DatabaseManager] = None):
         self.order_handler = order_handler
         self.webhook_secret = webhook_secret
+        self.catalog_sync = catalog_sync
+        self.db_manager = db_manager
+        # Keyed OpenSSL HMAC context built once; each verification copies
+        # it instead of re-encoding the secret and redoing the key setup
+        self._hmac_template = (
+            hmac.HMAC(webhook_secret.encode(), hashes.SHA256())
+            if webhook_secret else None
+        )
+        
+        self._events: queue.Queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        # Guards _closed, so no event can be queued behind _STOP
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._process_event_queue, name='webhook-events', daemon=True
+        )
+        self._worker.start()
+        # The worker is a daemon thread; drain the queue at interpreter exit
+        atexit.register(self.close)
         logger.info("Initialized WebhookHandler")
     
+    def close(self) -> None:
+        """Stop accepting events, process everything queued and stop the worker."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._events.put(_STOP)
+        self._worker.join()
+    
     def verify_signature(self, payload: str, signature: str) -> bool:
         """Verify webhook signature."""
-        if not self.webhook_secret:
+        if not self._hmac_template:
             return True
         
-        expected = hmac.new(
-            self.webhook_secret.encode(),
-            payload.encode(),
-            hashlib.sha256
-        ).hexdigest()
+        # Reject malformed signatures before hashing the payload; the
+        # expected length is public, so this leaks nothing
+        if not isinstance(signature, str) or len(signature) != SIGNATURE_HEX_LENGTH:
+            return False
+        
+        mac = self._hmac_template.copy()
+        mac.update(payload.encode() if isinstance(payload, str) else payload)
         
-        return hmac.compare_digest(expected, signature)
+        # verify() compares in constant time inside OpenSSL
+        try:
+            mac.verify(bytes.fromhex(signature))
+            return True
+        except (InvalidSignature, ValueError):
+            return False
     
     def handle_webhook(self, event_type: str, data: Dict[str, Any]) -> bool:
         """Handle webhook event."""
         try:
-            logger.info(f"Processing webhook: {event_type}")
+            logger.info("Processing webhook: %s", event_type)
             
-            if event_type == 'order.created':
-                return self._handle_order_created(data)
-            elif event_type == 'order.completed':
-                return self._handle_order_completed(data)
-            elif event_type == 'product.updated':
-                return self._handle_product_updated(data)
-            else:
+            handler = _DISPATCH.get(event_type)
+            if handler is None:
                 logger.warning(f"Unknown event type: {event_type}")
                 return False
+            return handler(self, data)
                 
         except Exception as e:
             logger.error(f"Webhook handling failed: {e}")
             return False
     
+    async def handle_webhook_async(self, event_type: str, data: Dict[str, Any]) -> bool:
+        """Handle webhook event from an ASGI / asyncio server.
+        
+        Events are only queued for the worker thread, so this never
+        blocks and runs directly on the event loop.
+        
+        Args:
+            event_type: Event name, e.g. 'order.created'
+            data: Decoded event payload
+            
+        Returns:
+            True if the event was accepted
+        """
+        return self.handle_webhook(event_type, data)
+    
     def _handle_order_created(self, data: Dict[str, Any]) -> bool:
         logger.info("Handling order creation")
-        return self.order_handler.process_order(data)
+        return self._enqueue(_ORDER, data)
     
     def _handle_order_completed(self, data: Dict[str, Any]) -> bool:
         logger.info("Handling order completion")
-        return self.order_handler.process_order(data)
+        return self._enqueue(_ORDER, data)
     
     def _handle_product_updated(self, data: Dict[str, Any]) -> bool:
         logger.info("Handling product update")
-        # TODO: Trigger catalog sync
-        return True
+        product_id = data.get('id')
+        if self.catalog_sync is None or product_id is None:
+            return True
+        return self._enqueue(_PRODUCT, product_id)
+    
+    def _enqueue(self, kind: str, payload: Any) -> bool:
+        """Queue an event for background processing."""
+        try:
+            with self._close_lock:
+                if self._closed:
+                    logger.warning("Webhook handler is closed, rejecting webhook")
+                    return False
+                self._events.put_nowait((kind, payload))
+            return True
+        except queue.Full:
+            # Reject so the sender retries later instead of losing the event
+            logger.warning("Webhook event queue is full, rejecting webhook")
+            return False
+    
+    def _process_event_queue(self) -> None:
+        """Worker loop: collect up to EVENT_BATCH_SIZE events per batch."""
+        while True:
+            item = self._events.get()
+            if item is _STOP:
+                return
+            
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + EVENT_BATCH_WAIT
+            while len(batch) < EVENT_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._process_batch(batch)
+            
+            if stop:
+                return
+    
+    def _process_batch(self, batch: List[Tuple[str, Any]]) -> None:
+        """Hand a drained batch to OrderHandler and CatalogSync."""
+        orders = [payload for kind, payload in batch if kind == _ORDER]
+        # Repeated updates of one product within a batch need one fetch
+        product_ids = list(dict.fromkeys(
+            payload for kind, payload in batch if kind == _PRODUCT
+        ))
+        
+        if orders:
+            self._process_orders(orders)
+        
+        if product_ids:
+            try:
+                self.catalog_sync.sync_products(product_ids)
+            except Exception as e:
+                logger.error(f"Background product sync failed: {e}")
+
+    
+    def _process_orders(self, orders: List[Dict[str, Any]]) -> None:
+        """Process orders, retrying the failed ones with exponential backoff."""
+        delay = ORDER_RETRY_DELAY
+        for attempt in range(1, ORDER_MAX_ATTEMPTS + 1):
+            try:
+                orders = self.order_handler.process_orders(orders)
+            except Exception as e:
+                logger.error(f"Background order processing failed: {e}")
+            if not orders:
+                return
+            if attempt < ORDER_MAX_ATTEMPTS:
+                logger.warning(f"{len(orders)} order(s) failed, retrying in {delay}s")
+                time.sleep(delay)
+                delay *= 2
+        
+        logger.error(f"Giving up on {len(orders)} order(s) after {ORDER_MAX_ATTEMPTS} attempts")
+        if self.db_manager is not None:
+            try:
+                self.db_manager.save_failed_orders(orders, ORDER_MAX_ATTEMPTS)
+                return
+            except Exception as e:
+                logger.error(f"Failed to store failed orders: {e}")
+        # Last resort: keep the payloads in the log so they can be replayed
+        for order in orders:
+            logger.error(f"Unprocessed order: {order}")
+
+
+# event_type -> WebhookHandler method, shared by all instances and
+# read-only so handlers cannot be rebound at runtime
+_DISPATCH = MappingProxyType({
+    'order.created': WebhookHandler._handle_order_created,
+    'order.completed': WebhookHandler._handle_order_completed,
+    'product.updated': WebhookHandler._handle_product_updated,
+})